@@ -0,0 +1,63 @@
+# advice.py
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable, Optional, Set
+
+from scenarios import Crisis
+from state import StateBackend
+
+
+class AdviceStore:
+    """Each team model's answer to a crisis, generated in the background as soon as the crisis activates.
+
+    Answers live in the state backend under the model and crisis id, not the
+    session, so later sessions and other workers reuse them. A record is
+    pending while a worker generates it, then ready or error; errors and
+    pending records older than ``stale_after`` seconds are generated again.
+    """
+
+    def __init__(
+        self,
+        state: StateBackend,
+        generate: Callable[[str, Crisis], Awaitable[str]],
+        stale_after: float = 600.0
+    ):
+        self.state = state
+        self.generate = generate
+        self.stale_after = stale_after
+        # Strong references, or the event loop may drop running tasks
+        self.tasks: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def key(model: str, crisis_id: str) -> str:
+        return f"advice:{model}:{crisis_id}"
+
+    async def get(self, model: str, crisis_id: str) -> Optional[dict]:
+        record = await self.state.get(self.key(model, crisis_id))
+        return json.loads(record) if record else None
+
+    def schedule(self, team: str, model: str, crisis: Crisis):
+        task = asyncio.create_task(self.pregenerate(team, model, crisis))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def pregenerate(self, team: str, model: str, crisis: Crisis):
+        key = self.key(model, crisis.id)
+        pending = json.dumps({"status": "pending", "started": time.time()})
+        # Claim the generation; another worker or an earlier activation may already have it
+        if not await self.state.setnx(key, pending):
+            existing = await self.get(model, crisis.id)
+            if existing["status"] == "ready":
+                return
+            if existing["status"] == "pending" and time.time() - existing["started"] < self.stale_after:
+                return
+            await self.state.set(key, pending)
+
+        try:
+            text = await self.generate(team, crisis)
+            record = {"status": "ready", "text": text, "generated_at": time.time()}
+        except Exception as e:
+            print(f"Advice for {crisis.id} from {model} failed: {e}")
+            record = {"status": "error", "error": str(e)}
+        await self.state.set(key, json.dumps(record))
@@ -0,0 +1,141 @@
+# balancer.py
+import hashlib
+import random
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+
+class CircuitBreaker:
+    """Stops traffic to a backend after repeated failures.
+
+    After ``threshold`` failures in a row the circuit opens and the backend
+    gets no requests. Once ``cooldown`` seconds have passed it goes half-open
+    and lets one trial request through: success closes it again, failure
+    reopens it for another cooldown.
+    """
+
+    __slots__ = ("threshold", "cooldown", "state", "failures", "opened_at", "trial")
+
+    def __init__(self, threshold: int = 5, cooldown: float = 15.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial = False
+
+    def allows(self) -> bool:
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            return not self.trial
+        return self.state == CLOSED
+
+    def on_pick(self):
+        if self.state == HALF_OPEN:
+            self.trial = True
+
+    def success(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.trial = False
+
+    def abandon(self):
+        """A trial request was cancelled before it had an outcome"""
+        self.trial = False
+
+    def failure(self):
+        self.failures += 1
+        self.trial = False
+        if self.state == HALF_OPEN or self.failures >= self.threshold:
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+
+class Backend:
+    """One instance serving a team, with its in-flight count, circuit and last health check"""
+
+    __slots__ = ("url", "key", "outstanding", "breaker", "healthy", "code", "latency", "error", "checked_at")
+
+    def __init__(self, url: str):
+        self.url = url
+        # Names the instance in affinity cookies without revealing its address
+        self.key = hashlib.sha256(url.encode()).hexdigest()[:16]
+        self.outstanding = 0
+        self.breaker = CircuitBreaker()
+        # None until the health prober has checked it
+        self.healthy: Optional[bool] = None
+        self.code: Optional[int] = None
+        self.latency: Optional[float] = None
+        self.error: Optional[str] = None
+        self.checked_at: Optional[float] = None
+
+    def describe(self) -> dict:
+        return {
+            "url": self.url,
+            "status": {True: "online", False: "offline", None: "unknown"}[self.healthy],
+            "circuit": self.breaker.state,
+            "code": self.code,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "error": self.error,
+            "outstanding": self.outstanding,
+            "checked_at": self.checked_at
+        }
+
+
+class BackendPool:
+    """A team's instances; each request goes to the healthy one with the fewest in flight.
+
+    A client already tied to an instance (``affinity``, a Backend key) stays
+    on it while it is available: each Open WebUI instance has its own logins
+    and chats. Only clients without one, or whose instance has been ejected,
+    are spread by load.
+    """
+
+    def __init__(self, urls: Iterable[str] = ()):
+        self.backends: List[Backend] = []
+        # Recent time-to-first-byte samples, for the hedging delay
+        self.ttfb = deque(maxlen=200)
+        self.update(urls)
+
+    def update(self, urls: Iterable[str]):
+        """Replace the instance list, keeping counters and health for instances still present"""
+        current: Dict[str, Backend] = {backend.url: backend for backend in self.backends}
+        self.backends = [current.get(url) or Backend(url) for url in dict.fromkeys(urls)]
+
+    @property
+    def urls(self) -> List[str]:
+        return [backend.url for backend in self.backends]
+
+    def pick(self, exclude: Backend = None, affinity: str = None) -> Optional[Backend]:
+        # Open circuits get nothing; ejected (unhealthy) backends only when nothing else is left
+        allowed = [b for b in self.backends if b is not exclude and b.breaker.allows()]
+        candidates = [b for b in allowed if b.healthy is not False] or allowed
+        if not candidates:
+            return None
+        for b in candidates:
+            if b.key == affinity:
+                return b
+        fewest = min(b.outstanding for b in candidates)
+        # Random among the least loaded, so idle pools don't pile onto the first instance
+        return random.choice([b for b in candidates if b.outstanding == fewest])
+
+    def acquire(self, exclude: Backend = None, affinity: str = None) -> Optional[Backend]:
+        backend = self.pick(exclude, affinity)
+        if backend:
+            backend.outstanding += 1
+            backend.breaker.on_pick()
+        return backend
+
+    def release(self, backend: Backend):
+        backend.outstanding -= 1
+
+    def p95(self, min_samples: int = 20) -> Optional[float]:
+        """95th percentile time to first byte, once there are enough samples"""
+        if len(self.ttfb) < min_samples:
+            return None
+        samples = sorted(self.ttfb)
+        return samples[int(len(samples) * 0.95) - 1]
@@ -0,0 +1,141 @@
+# batcher.py
+import asyncio
+import contextvars
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+
+class MicroBatcher:
+    """Collects one team's upstream requests over a short window and sends them together.
+
+    A batch closes ``window`` seconds after its first request arrives or when
+    it holds ``max_batch`` requests. Requests that share a batch key go
+    upstream in one ``send_batch`` call; requests without a key (APIs that
+    take one input per call) are sent concurrently with ``send_one``. Each
+    caller gets its own result back as soon as the call carrying it returns,
+    and the next window starts collecting while a batch is in flight.
+    """
+
+    def __init__(
+        self,
+        send_one: Callable[[dict], Awaitable[Any]],
+        send_batch: Callable[[List[dict]], Awaitable[List[Any]]],
+        window: float = 0.02,
+        max_batch: int = 16
+    ):
+        self.send_one = send_one
+        self.send_batch = send_batch
+        self.window = window
+        self.max_batch = max_batch
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+        # Strong references to in-flight sends
+        self.sending: Set[asyncio.Task] = set()
+
+        # Metrics
+        self.requests = 0
+        self.batches = 0
+        self.upstream_calls = 0
+        self.batch_sizes: Counter = Counter()
+        self.queue_delay_total = 0.0
+        self.queue_delay_max = 0.0
+
+    async def submit(self, payload: dict, batch_key: Optional[str] = None):
+        if self.task is None:
+            self.queue = asyncio.Queue()
+            # A fresh context: the runner serves every caller, not the one that happened to start it
+            self.task = contextvars.Context().run(asyncio.create_task, self.run())
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        await self.queue.put((payload, batch_key, future, loop.time(), contextvars.copy_context()))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            self.dispatch(batch)
+
+    def dispatch(self, batch: List[Tuple[dict, Optional[str], asyncio.Future, float, contextvars.Context]]):
+        now = asyncio.get_running_loop().time()
+        self.requests += len(batch)
+        self.batches += 1
+        self.batch_sizes[len(batch)] += 1
+        for _, _, _, enqueued, _ in batch:
+            delay = now - enqueued
+            self.queue_delay_total += delay
+            self.queue_delay_max = max(self.queue_delay_max, delay)
+
+        groups: Dict[str, list] = {}
+        for item in batch:
+            if item[1] is None:
+                self.start(self.send_single(item), item[4])
+            else:
+                groups.setdefault(item[1], []).append(item)
+        for items in groups.values():
+            if len(items) == 1:
+                self.start(self.send_single(items[0]), items[0][4])
+            else:
+                self.start(self.send_group(items))
+
+    def start(self, coro, context: contextvars.Context = None):
+        # A lone request is sent in its caller's context, so request-scoped state (trace ids) follows it
+        task = context.run(asyncio.create_task, coro) if context else asyncio.create_task(coro)
+        self.sending.add(task)
+        task.add_done_callback(self.sending.discard)
+
+    async def send_single(self, item):
+        payload, _, future, _, _ = item
+        self.upstream_calls += 1
+        try:
+            result = await self.send_one(payload)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    async def send_group(self, items):
+        self.upstream_calls += 1
+        try:
+            results = await self.send_batch([payload for payload, _, _, _, _ in items])
+        except Exception as e:
+            results = [e] * len(items)
+        for (_, _, future, _, _), result in zip(items, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "upstream_calls": self.upstream_calls,
+            "mean_batch_size": round(self.requests / self.batches, 2) if self.batches else 0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "mean_queue_delay_ms": round(self.queue_delay_total / self.requests * 1000, 2) if self.requests else 0,
+            "max_queue_delay_ms": round(self.queue_delay_max * 1000, 2)
+        }
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""Load test: a full class of dashboards, an instructor and log_event bursts against the app.
+
+Runs the FastAPI app in-process through httpx's ASGI transport, over real
+sockets against a uvicorn subprocess, or both, and prints one JSON document
+with p50/p95/p99 latency and requests/s per endpoint plus server RSS.
+
+Dashboards behave like render_team_dashboard's client: ``--client stream``
+(the default) holds one /stream/{team} SSE connection per dashboard;
+``--client longpoll`` is the page's fallback while the stream is down, a
+/current_crisis?since= long poll plus /news_feed every 20 s; ``--client poll``
+replays fixed 5 s crisis polls, which no shipped page does any more, as a
+worst case to compare against.
+
+    python benchmarks/loadtest.py --dashboards 120 --duration 60
+    python benchmarks/loadtest.py --transport socket --client longpoll --speed 5 --output load.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from functools import partial
+from typing import Dict, List, Optional
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADMIN_TOKEN = "bench-token"
+TEAMS = ["usa", "china", "neutral"]
+
+# Seconds: news polling while the dashboard's stream is down (see render_team_dashboard),
+# the fixed crisis polling of --client poll, how long the server holds a long poll
+# (the page sends no timeout, so the server default) and the page's /advice retry delay
+NEWS_POLL_INTERVAL = 20
+CRISIS_POLL_INTERVAL = 5
+LONG_POLL_TIMEOUT = 25
+ADVICE_RETRY = 3
+CLIENTS = ("stream", "longpoll", "poll")
+
+# Memory backend, no journal file, known admin token; set before main is imported
+SERVER_ENV = {"ADMIN_TOKEN": ADMIN_TOKEN, "EVENT_LOG_PATH": "", "STATE_BACKEND": "memory://"}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def rss_mb(pid: int = None) -> float:
+    """Resident set size of a process from /proc, in MB (0 where /proc is unavailable)"""
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+class Recorder:
+    """Latencies and failures per endpoint name"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        # Server-sent events received, by event name
+        self.events: Dict[str, int] = defaultdict(int)
+        # Advice loads running alongside their dashboards, cancelled when the run ends
+        self.background: List[asyncio.Future] = []
+
+    async def call(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[name] += 1
+            return None
+        self.latencies[name].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+        return response
+
+    def report(self, elapsed: float) -> Dict[str, dict]:
+        endpoints = {}
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            values = sorted(self.latencies[name])
+            endpoints[name] = {
+                "count": len(values),
+                "errors": self.errors[name],
+                "rps": round(len(values) / elapsed, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+                "max_ms": round(values[-1] * 1000, 2) if values else 0.0
+            }
+        return endpoints
+
+
+async def dashboard(client: httpx.AsyncClient, recorder: Recorder, team: str, args, stop_at: float, open_stream):
+    """One student's dashboard: load the page, then follow the game the way --client says"""
+    # Students don't all open the page in the same millisecond
+    await asyncio.sleep(random.uniform(0, CRISIS_POLL_INTERVAL / args.speed))
+    session = f"?session={args.session}"
+    await recorder.call(client, "GET /dashboard/{team}", "GET", f"/dashboard/{team}{session}")
+
+    if args.client == "stream":
+        await follow_stream(client, recorder, team, args, stop_at, open_stream)
+    elif args.client == "longpoll":
+        await asyncio.gather(
+            long_poll_crisis(client, recorder, team, args, stop_at),
+            poll_news(client, recorder, args, stop_at)
+        )
+    else:
+        await poll_fixed(client, recorder, team, args, stop_at)
+
+
+async def follow_stream(client: httpx.AsyncClient, recorder: Recorder, team: str, args, stop_at: float, open_stream):
+    """connectStream(): one SSE connection; the first frame's latency is recorded, then events are counted"""
+    name = "GET /stream/{team}"
+    started = time.perf_counter()
+    advised = set()
+    buffer = ""
+    try:
+        async with contextlib.aclosing(open_stream(f"/stream/{team}?session={args.session}")) as chunks:
+            async for chunk in chunks:
+                if started is not None:
+                    recorder.latencies[name].append(time.perf_counter() - started)
+                    started = None
+                buffer += chunk
+                *frames, buffer = buffer.split("\n\n")
+                for frame in frames:
+                    event = re.search(r"^event: (\w+)\ndata: (.*)$", frame, re.M)
+                    if not event:
+                        continue
+                    recorder.events[event.group(1)] += 1
+                    if event.group(1) == "crisis":
+                        await on_crisis(client, recorder, team, json.loads(event.group(2)), args, advised)
+                if time.monotonic() >= stop_at:
+                    break
+    except httpx.HTTPError:
+        recorder.errors[name] += 1
+
+
+async def on_crisis(client: httpx.AsyncClient, recorder: Recorder, team: str, data: dict, args, advised: set):
+    """A new crisis makes the page fetch its advice, retrying while it is still being generated"""
+    crisis = data.get("crisis")
+    if not crisis or crisis["id"] in advised:
+        return
+    advised.add(crisis["id"])
+
+    async def load_advice():
+        for _ in range(60):
+            response = await recorder.call(client, "GET /advice/{team}", "GET", f"/advice/{team}?session={args.session}")
+            if response is None or response.json().get("status") != "pending":
+                return
+            await asyncio.sleep(ADVICE_RETRY / args.speed)
+
+    # The page doesn't stop listening while advice loads
+    recorder.background.append(asyncio.ensure_future(load_advice()))
+
+
+async def long_poll_crisis(client: httpx.AsyncClient, recorder: Recorder, team: str, args, stop_at: float):
+    """longPollCrisis(): held requests with ?since=, one answer per change; latencies are mostly hold time"""
+    etag, version = None, None
+    advised = set()
+    timeout = LONG_POLL_TIMEOUT / args.speed
+    while time.monotonic() < stop_at:
+        headers = {"If-None-Match": etag} if etag else {}
+        params = {"session": args.session}
+        name = "GET /current_crisis/{team}"
+        if version is not None:
+            params.update(since=version, timeout=timeout)
+            name += "?since"
+        response = await recorder.call(client, name, "GET", f"/current_crisis/{team}", params=params, headers=headers)
+        if response is None or response.status_code >= 400:
+            await asyncio.sleep(5 / args.speed)
+            continue
+        if response.status_code == 304:
+            continue
+        etag = response.headers.get("etag")
+        data = response.json()
+        version = data["version"]
+        await on_crisis(client, recorder, team, data, args, advised)
+
+
+async def poll_news(client: httpx.AsyncClient, recorder: Recorder, args, stop_at: float):
+    while time.monotonic() < stop_at:
+        await recorder.call(client, "GET /news_feed", "GET", f"/news_feed?session={args.session}")
+        await asyncio.sleep(NEWS_POLL_INTERVAL / args.speed)
+
+
+async def poll_fixed(client: httpx.AsyncClient, recorder: Recorder, team: str, args, stop_at: float):
+    """Crisis every 5 s and news every 20 s; no shipped page polls like this any more"""
+    session = f"?session={args.session}"
+    etag = None
+    next_crisis = next_news = time.monotonic()
+    while time.monotonic() < stop_at:
+        now = time.monotonic()
+        if now >= next_crisis:
+            headers = {"If-None-Match": etag} if etag else {}
+            response = await recorder.call(
+                client, "GET /current_crisis/{team}", "GET", f"/current_crisis/{team}{session}", headers=headers
+            )
+            if response is not None and response.status_code == 200:
+                etag = response.headers.get("etag")
+            next_crisis += CRISIS_POLL_INTERVAL / args.speed
+        if now >= next_news:
+            await recorder.call(client, "GET /news_feed", "GET", f"/news_feed{session}")
+            next_news += NEWS_POLL_INTERVAL / args.speed
+        await asyncio.sleep(max(0.0, min(next_crisis, next_news) - time.monotonic()))
+
+
+async def instructor(client: httpx.AsyncClient, recorder: Recorder, crisis_ids: List[str], args, stop_at: float):
+    """Admin injecting a crisis into a random team every --inject-every seconds"""
+    while time.monotonic() < stop_at:
+        await asyncio.sleep(args.inject_every / args.speed)
+        params = {
+            "team": random.choice(TEAMS), "crisis_id": random.choice(crisis_ids),
+            "token": ADMIN_TOKEN, "session": args.session
+        }
+        await recorder.call(client, "POST /inject_crisis", "POST", "/inject_crisis", params=params)
+
+
+async def log_bursts(client: httpx.AsyncClient, recorder: Recorder, args, stop_at: float):
+    """Every team submitting its decisions at once, --burst-size events per burst"""
+    while time.monotonic() < stop_at:
+        await asyncio.sleep(args.burst_every / args.speed)
+        await asyncio.gather(*(
+            recorder.call(client, "POST /log_event", "POST", "/log_event", params={
+                "team": random.choice(TEAMS), "event_id": "bench", "event_title": "Benchmark event",
+                "response": "x" * 200, "session": args.session
+            })
+            for _ in range(args.burst_size)
+        ))
+
+
+async def drive(client: httpx.AsyncClient, args, rss, open_stream) -> dict:
+    """Run the whole class against one client and summarize it; open_stream(path) yields a streamed body's text"""
+    recorder = Recorder()
+    # The admin page's crisis selector lists every crisis id
+    admin_page = await client.get("/admin", params={"token": ADMIN_TOKEN})
+    crisis_ids = sorted(set(re.findall(r'<option value="([^"]+)"', admin_page.text))) or ["cyber_infrastructure"]
+
+    rss_start = rss()
+    peak = [rss_start]
+
+    async def sample_rss():
+        while True:
+            peak[0] = max(peak[0], rss())
+            await asyncio.sleep(0.5)
+
+    sampler = asyncio.create_task(sample_rss())
+    started = time.monotonic()
+    stop_at = started + args.duration
+    tasks = [dashboard(client, recorder, TEAMS[i % len(TEAMS)], args, stop_at, open_stream) for i in range(args.dashboards)]
+    tasks += [instructor(client, recorder, crisis_ids, args, stop_at), log_bursts(client, recorder, args, stop_at)]
+    tasks = [asyncio.ensure_future(task) for task in tasks]
+    # Streams and held long polls only notice the end with their next frame or answer; cut them off
+    await asyncio.wait(tasks, timeout=args.duration + 1)
+    tasks += recorder.background
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.monotonic() - started
+    sampler.cancel()
+
+    endpoints = recorder.report(elapsed)
+    total = sum(endpoint["count"] for endpoint in endpoints.values())
+    return {
+        "duration_s": round(elapsed, 2),
+        "requests": total,
+        "rps": round(total / elapsed, 2),
+        "rss_mb": {"start": round(rss_start, 1), "peak": round(peak[0], 1), "end": round(rss(), 1)},
+        "endpoints": endpoints,
+        "stream_events": dict(sorted(recorder.events.items()))
+    }
+
+
+async def lifespan(app, event: str, state: dict):
+    """Drive the app's startup or shutdown hooks the way an ASGI server would"""
+    if "queue" not in state:
+        state["queue"] = asyncio.Queue()
+        state["sent"] = asyncio.Queue()
+
+        async def receive():
+            return await state["queue"].get()
+
+        async def send(message):
+            await state["sent"].put(message)
+
+        state["task"] = asyncio.create_task(app({"type": "lifespan", "asgi": {"version": "3.0"}}, receive, send))
+    await state["queue"].put({"type": f"lifespan.{event}"})
+    await state["sent"].get()
+
+
+async def run_asgi(args) -> dict:
+    os.environ.update(SERVER_ENV)
+    sys.path.insert(0, ROOT)
+    # The app logs with print(); keep stdout for the report
+    with contextlib.redirect_stdout(sys.stderr):
+        return await drive_asgi(args)
+
+
+async def drive_asgi(args) -> dict:
+    import main
+
+    state = {}
+    await lifespan(main.app, "startup", state)
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await ensure_session(client, args)
+            result = await drive(client, args, rss_mb, partial(asgi_stream, main.app))
+    finally:
+        await lifespan(main.app, "shutdown", state)
+    # Client and server share this process here
+    result["rss_note"] = "in-process: client and app together"
+    return result
+
+
+async def asgi_stream(app, path: str):
+    """Text of a streamed GET, straight from the app: httpx's ASGITransport waits for the whole body"""
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": query.encode(),
+        "headers": [(b"host", b"bench")], "server": ("bench", 80), "client": ("127.0.0.1", 50000)
+    }
+    messages = asyncio.Queue()
+    gone = asyncio.Event()
+
+    async def receive():
+        await gone.wait()
+        return {"type": "http.disconnect"}
+
+    app_task = asyncio.create_task(app(scope, receive, messages.put))
+    try:
+        start = await messages.get()
+        if start["status"] != 200:
+            raise httpx.HTTPError(f"{start['status']} from {path}")
+        while True:
+            message = await messages.get()
+            if message.get("body"):
+                yield message["body"].decode()
+            if not message.get("more_body"):
+                return
+    finally:
+        gone.set()
+        app_task.cancel()
+        await asyncio.gather(app_task, return_exceptions=True)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run_socket(args) -> dict:
+    server = None
+    base_url = args.url
+    if not base_url:
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=ROOT, env={**os.environ, **SERVER_ENV}, stdout=sys.stderr
+        )
+        base_url = f"http://127.0.0.1:{port}"
+
+    try:
+        limits = httpx.Limits(max_connections=args.dashboards + args.burst_size + 10)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+            for _ in range(100):
+                try:
+                    await client.get("/news_feed")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            await ensure_session(client, args)
+
+            async def open_stream(path: str):
+                async with client.stream("GET", path, timeout=httpx.Timeout(30, read=None)) as response:
+                    response.raise_for_status()
+                    async for text in response.aiter_text():
+                        yield text
+
+            # Only a server we started has a PID to measure
+            result = await drive(client, args, lambda: rss_mb(server.pid) if server else 0.0, open_stream)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+    result["rss_note"] = "uvicorn server process" if server else "remote server, not measured"
+    return result
+
+
+async def ensure_session(client: httpx.AsyncClient, args):
+    if args.session != "default":
+        await client.post("/admin/sessions", params={"token": ADMIN_TOKEN, "session_id": args.session})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dashboards", type=int, default=40, help="concurrent student dashboards")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per transport")
+    parser.add_argument("--client", choices=CLIENTS, default="stream", help="how dashboards follow the game (see above)")
+    parser.add_argument("--speed", type=float, default=1.0, help="compress the polling schedule by this factor")
+    parser.add_argument("--transport", choices=["asgi", "socket", "both"], default="both")
+    parser.add_argument("--url", help="run the socket test against this server instead of a local uvicorn")
+    parser.add_argument("--inject-every", type=float, default=10, help="seconds between admin injects")
+    parser.add_argument("--burst-every", type=float, default=15, help="seconds between log_event bursts")
+    parser.add_argument("--burst-size", type=int, default=30, help="log_event requests per burst")
+    parser.add_argument("--session", default="default")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = {"config": vars(args), "runs": {}}
+    if args.transport in ("asgi", "both"):
+        report["runs"]["asgi"] = asyncio.run(run_asgi(args))
+    if args.transport in ("socket", "both"):
+        report["runs"]["socket"] = asyncio.run(run_socket(args))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""Microbenchmarks for the game-state hot paths, checked against a stored baseline.
+
+Each benchmark runs at several sizes of the data it scans: crisis-bank size,
+timeline length or event-log size. A case is calibrated pytest-benchmark style
+(iterations per round until a round takes --min-time, rounds until --max-time)
+and its median is compared with benchmarks/baseline.json; the run exits 1 when
+any case is more than --tolerance slower than its baseline.
+
+    python benchmarks/microbench.py                      # compare with the baseline
+    python benchmarks/microbench.py --save-baseline      # record a new baseline
+    python benchmarks/microbench.py --sizes 10,1000 -k crisis --output bench.json
+
+Baselines are machine-specific: record one on the machine that checks it.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_SIZES = [10, 1_000, 100_000, 1_000_000]
+TEAMS = ["usa", "china", "neutral"]
+# Injected crises rotate through this many ids spread over the bank
+INJECT_IDS = 64
+
+# Memory backend, no journal file, known admin token; set before main is imported
+os.environ.update({"ADMIN_TOKEN": "bench-token", "EVENT_LOG_PATH": "", "STATE_BACKEND": "memory://"})
+sys.path.insert(0, ROOT)
+# main logs with print(); keep stdout for the report
+with contextlib.redirect_stdout(sys.stderr):
+    import main
+
+from fastapi import Request
+
+from scenarios import ScenarioIndex
+from sessions import SessionStore
+from timeline import Timeline
+
+
+class Case(NamedTuple):
+    name: str
+    # Which data size the case scans: crisis_bank, timeline, event_log or None
+    dimension: Optional[str]
+    size: Optional[int]
+    # Builds the fixture and returns the zero-argument function to time (sync or async)
+    setup: Callable[[int], Callable]
+
+    @property
+    def id(self) -> str:
+        return f"{self.name}[{self.dimension}={self.size}]" if self.dimension else self.name
+
+
+def crisis_bank(size: int) -> List[dict]:
+    themes = ["cyber", "ai", "nuclear", "climate", "medical", "trade"]
+    return [
+        {
+            "id": f"{themes[i % len(themes)]}_crisis_{i}",
+            "title": f"ALERT: Benchmark crisis {i}",
+            "description": "A synthetic crisis with a description about as long as the real ones. " * 2,
+            "prompt": "Take the risky action?"
+        }
+        for i in range(size)
+    ]
+
+
+def news_timeline(size: int) -> Dict[str, List[dict]]:
+    months: Dict[str, List[dict]] = {}
+    for i in range(size):
+        months.setdefault(f"Month {i // 5}", []).append(
+            {"id": f"news_{i}", "text": f"Benchmark headline number {i}", "trigger": None}
+        )
+    return months
+
+
+def event_log(size: int) -> Dict[str, List[dict]]:
+    log: Dict[str, List[dict]] = {team: [] for team in TEAMS}
+    for i in range(size):
+        log[TEAMS[i % len(TEAMS)]].append({
+            "timestamp": "2026-03-01T10:15:00.000000",
+            "event_id": f"crisis_{i}",
+            "event_title": f"ALERT: Benchmark crisis {i}",
+            "response": "We restore power but keep offensive capabilities locked."
+        })
+    return log
+
+
+def run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def use_bank(size: int):
+    """Swap main's crisis index for one of ``size`` crises"""
+    main.scenarios = ScenarioIndex(crisis_bank(size), main.timeline)
+
+
+def open_session(timeline: Timeline = None):
+    """A fresh store holding one bench session, without the timeline pump"""
+    main.sessions = SessionStore(timeline or main.timeline, main.TEAM_ENDPOINTS)
+    return main.sessions.create(main.DEFAULT_SESSION, main.demo_settings["news_interval"])
+
+
+def http_request(path: str, headers: Dict[str, str] = None) -> Request:
+    return Request({
+        "type": "http", "method": "GET", "path": path, "query_string": b"",
+        "headers": [(k.encode(), v.encode()) for k, v in (headers or {}).items()]
+    })
+
+
+def setup_news_feed(size: int):
+    timeline = Timeline(news_timeline(size), main.demo_settings["news_interval"])
+    session = open_session(timeline)
+    # Halfway through the timeline
+    session.timeline.reset(start=time.time() - size / 2 * session.timeline.interval)
+    request = http_request("/news_feed")
+    return lambda: main.get_news_feed(request)
+
+
+def setup_current_crisis(size: int, revalidate: bool = False):
+    use_bank(size)
+    session = open_session()
+    crisis = next(iter(main.scenarios.crises.values()))
+    run(seed_crisis(session, "usa", crisis))
+    headers = {}
+    if revalidate:
+        _, version, _, countdown = run(main.read_crisis(session, "usa"))
+        headers["If-None-Match"] = main.crisis_etag(session, version, countdown)
+    request = http_request("/current_crisis/usa", headers)
+    return lambda: main.get_current_crisis(request, "usa")
+
+
+async def seed_crisis(session, team: str, crisis):
+    await main.state.set(session.key("crisis", team), crisis.id)
+    await main.state.incr(session.key("version", team))
+
+
+def setup_inject_crisis(size: int):
+    use_bank(size)
+    open_session()
+    ids = list(main.scenarios.crises)[::max(1, size // INJECT_IDS)][:INJECT_IDS]
+    # Advice for these crises is already generated, as it is after the first class
+    for crisis_id in ids:
+        for model in main.TEAM_MODEL_NAMES.values():
+            run(main.state.set(main.advice.key(model, crisis_id), json.dumps({"status": "ready"})))
+    counter = iter(range(1 << 62))
+    return lambda: main.inject_crisis("usa", ids[next(counter) % len(ids)], token="bench-token")
+
+
+def setup_log_html(size: int):
+    log = event_log(size)
+    return lambda: main.generate_log_html(log)
+
+
+def setup_crisis_options(size: int):
+    use_bank(size)
+    return main.generate_crisis_options
+
+
+def setup_dashboard_render(size: int):
+    return lambda: main.render_team_dashboard("usa")
+
+
+def setup_dashboard_cached(size: int):
+    open_session()
+    main.render_cache.invalidate()
+    request = http_request("/dashboard/usa", {"accept-encoding": "gzip"})
+    return lambda: main.team_dashboard(request, "usa")
+
+
+def cases(sizes: List[int]) -> List[Case]:
+    sized = [
+        ("get_news_feed", "timeline", setup_news_feed),
+        ("get_current_crisis", "crisis_bank", setup_current_crisis),
+        ("get_current_crisis_304", "crisis_bank", lambda size: setup_current_crisis(size, revalidate=True)),
+        ("inject_crisis", "crisis_bank", setup_inject_crisis),
+        ("generate_log_html", "event_log", setup_log_html),
+        ("generate_crisis_options", "crisis_bank", setup_crisis_options),
+    ]
+    result = [Case(name, dimension, size, setup) for name, dimension, setup in sized for size in sizes]
+    # The dashboard embeds no game data, so it has no size to vary
+    result.append(Case("render_team_dashboard", None, None, setup_dashboard_render))
+    result.append(Case("team_dashboard_cached", None, None, setup_dashboard_cached))
+    return result
+
+
+async def timed(fn: Callable, is_async: bool, iterations: int) -> float:
+    """Seconds for ``iterations`` calls"""
+    started = time.perf_counter()
+    if is_async:
+        for _ in range(iterations):
+            await fn()
+    else:
+        for _ in range(iterations):
+            fn()
+    return time.perf_counter() - started
+
+
+async def measure(fn: Callable, min_time: float, max_time: float, min_rounds: int) -> dict:
+    # Warm-up call, which also tells route handlers from plain functions
+    result = fn()
+    is_async = asyncio.iscoroutine(result)
+    if is_async:
+        await result
+
+    # Calibrate: double the iterations until one round takes min_time
+    iterations = 1
+    while True:
+        elapsed = await timed(fn, is_async, iterations)
+        if elapsed >= min_time or iterations >= 1 << 20:
+            break
+        iterations *= 2
+
+    rounds: List[float] = []
+    deadline = time.perf_counter() + max_time
+    while len(rounds) < min_rounds or time.perf_counter() < deadline:
+        rounds.append(await timed(fn, is_async, iterations) / iterations)
+        # Let background tasks the calls scheduled (advice generation) run between rounds
+        await asyncio.sleep(0)
+    return {
+        "min": min(rounds),
+        "median": statistics.median(rounds),
+        "mean": statistics.fmean(rounds),
+        "stddev": statistics.stdev(rounds) if len(rounds) > 1 else 0.0,
+        "rounds": len(rounds),
+        "iterations": iterations,
+        "ops": 1 / statistics.median(rounds)
+    }
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float, floor: float) -> List[str]:
+    """Cases whose median is more than tolerance (and floor seconds) above the baseline"""
+    regressions = []
+    for case_id, result in results.items():
+        reference = baseline.get(case_id)
+        if reference is None:
+            result["baseline"] = None
+            continue
+        ratio = result["median"] / reference["median"]
+        result["baseline"] = reference["median"]
+        result["ratio"] = round(ratio, 3)
+        if ratio > 1 + tolerance and result["median"] - reference["median"] > floor:
+            regressions.append(case_id)
+    return regressions
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma-separated data sizes")
+    parser.add_argument("-k", dest="filter", help="only cases whose id contains this text")
+    parser.add_argument("--min-time", type=float, default=0.005, help="seconds per calibrated round")
+    parser.add_argument("--max-time", type=float, default=0.5, help="seconds of rounds per case")
+    parser.add_argument("--min-rounds", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown of the median, 0.5 = 50%%")
+    parser.add_argument("--floor", type=float, default=2e-6, help="ignore slowdowns smaller than this many seconds")
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    selected = [case for case in cases(sizes) if not args.filter or args.filter in case.id]
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    results: Dict[str, dict] = {}
+    with contextlib.redirect_stdout(sys.stderr):
+        for case in selected:
+            fn = case.setup(case.size)
+            stats = loop.run_until_complete(measure(fn, args.min_time, args.max_time, args.min_rounds))
+            results[case.id] = {"name": case.name, "dimension": case.dimension, "size": case.size, **stats}
+            print(f"{case.id:<52} median {format_time(stats['median']):>10}  ({stats['rounds']} x {stats['iterations']})")
+
+    regressions: List[str] = []
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)["cases"]
+        baseline.update({case_id: {"median": r["median"], "min": r["min"]} for case_id, r in results.items()})
+        with open(args.baseline, "w") as f:
+            json.dump({"python": sys.version.split()[0], "cases": dict(sorted(baseline.items()))}, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["cases"], args.tolerance, args.floor)
+        for case_id in regressions:
+            r = results[case_id]
+            print(f"REGRESSION {case_id}: {format_time(r['median'])} vs baseline {format_time(r['baseline'])} ({r['ratio']}x)", file=sys.stderr)
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one", file=sys.stderr)
+
+    output = json.dumps({"results": results, "regressions": regressions}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,149 @@
+# discovery.py
+import asyncio
+import re
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+
+class Candidate(NamedTuple):
+    """A running instance that could serve a team"""
+    id: str
+    url: str
+    # Instance label and image name, searched for team or model names
+    tags: str
+
+
+def matches(candidate: Candidate, keywords: Iterable[str]) -> bool:
+    # Whole words only, so "yi" matches "yi-34b" but not "yield"
+    return any(re.search(rf"(?<![a-z]){re.escape(k)}(?![a-z])", candidate.tags.lower()) for k in keywords)
+
+
+def model_keywords(model: str) -> List[str]:
+    """Words an instance label or image would use for a model: "qwen2:72b" gives qwen2 and qwen"""
+    name = model.lower().split(":")[0].split("/")[-1]
+    family = re.match(r"[a-z]+", name)
+    return list(dict.fromkeys([name] + ([family.group()] if family else [])))
+
+
+def assign_teams(
+    candidates: List[Candidate],
+    latencies: List[Optional[float]],
+    team_models: Dict[str, Iterable[str]],
+    max_latency: float
+) -> Dict[str, List[str]]:
+    """Healthy instance URLs per team, fastest first.
+
+    Instances whose label or image names a team's model go to that team.
+    Unlabelled instances are spares for teams left without one. Instances
+    that failed the probe or answered slower than max_latency are dropped.
+    """
+    healthy = sorted(
+        (latency, candidate) for candidate, latency in zip(candidates, latencies)
+        if latency is not None and latency <= max_latency
+    )
+
+    pools: Dict[str, List[str]] = {team: [] for team in team_models}
+    spares = []
+    for _, candidate in healthy:
+        team = next((team for team, keywords in team_models.items() if matches(candidate, keywords)), None)
+        if team:
+            pools[team].append(candidate.url)
+        else:
+            spares.append(candidate.url)
+
+    for team, urls in pools.items():
+        if not urls and spares:
+            urls.append(spares.pop(0))
+    return pools
+
+
+class InstanceDiscovery:
+    """Cached, non-blocking wrapper around a blocking instance lookup.
+
+    ``fetch`` runs in the default thread-pool executor so it never stalls the
+    event loop. Its candidates then go to the async ``assign``, which turns
+    them into team endpoints. Callers arriving while a lookup is running
+    share it instead of starting another. Results stay fresh for ``ttl``
+    seconds, and a background loop refreshes them every ``interval`` seconds.
+    ``on_change`` is called whenever the mapping differs from the previous one.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], Optional[List[Candidate]]],
+        assign: Callable[[List[Candidate]], Awaitable[Dict[str, List[str]]]],
+        on_change: Callable[[Dict[str, List[str]]], None],
+        ttl: float = 30.0,
+        interval: float = 300.0
+    ):
+        self.fetch = fetch
+        self.assign = assign
+        self.on_change = on_change
+        self.ttl = ttl
+        self.interval = interval
+        self.instances: Optional[Dict[str, List[str]]] = None
+        self.fetched_at = 0.0
+        self.inflight: Optional[asyncio.Future] = None
+        self.task: Optional[asyncio.Task] = None
+        # How long the last lookup took (fetch plus probes), and lookup outcomes, for /metrics
+        self.last_duration: Optional[float] = None
+        self.refreshes = 0
+        self.failures = 0
+
+    async def get(self, max_age: float = None) -> Optional[Dict[str, List[str]]]:
+        """Instances no older than max_age (default ttl); None if the lookup failed"""
+        max_age = self.ttl if max_age is None else max_age
+        if self.instances is not None and time.monotonic() - self.fetched_at < max_age:
+            return self.instances
+
+        if self.inflight is None:
+            self.inflight = asyncio.ensure_future(self.refresh())
+        # shield: a caller that disconnects must not cancel the lookup others wait on
+        return await asyncio.shield(self.inflight)
+
+    async def refresh(self) -> Optional[Dict[str, List[str]]]:
+        started = time.monotonic()
+        succeeded = False
+        try:
+            # to_thread carries the context over, so the fetch's span keeps the caller's request id
+            candidates = await asyncio.to_thread(self.fetch)
+            if candidates is None:
+                return None
+            instances = await self.assign(candidates)
+            if instances:
+                changed = instances != self.instances
+                self.instances = instances
+                self.fetched_at = time.monotonic()
+                if changed:
+                    self.on_change(instances)
+            succeeded = bool(instances)
+            return instances
+        finally:
+            self.inflight = None
+            self.last_duration = time.monotonic() - started
+            self.refreshes += 1
+            # Counts empty results and exceptions from fetch, assign or on_change alike
+            if not succeeded:
+                self.failures += 1
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while True:
+            try:
+                await self.get(max_age=0)
+            except Exception as e:
+                # Already counted in failures; try again next interval instead of stopping for good
+                print(f"Instance refresh failed: {type(e).__name__}: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
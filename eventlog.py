@@ -0,0 +1,115 @@
+# eventlog.py
+import asyncio
+import json
+import os
+import time
+from typing import Iterator, List, Optional
+
+
+class EventLogWriter:
+    """Write-behind JSONL journal for the event log.
+
+    log_event only queues the record; a background task appends queued
+    records to the file in batches, flushing when ``batch_size`` records are
+    waiting or ``flush_interval`` seconds have passed. The queue is bounded,
+    so if the disk falls behind, callers wait instead of memory growing.
+    A batch that still fails after ``retries`` attempts is dropped and
+    counted; the game keeps running on the state backend without it.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        max_pending: int = 10000,
+        retries: int = 3,
+        retry_delay: float = 0.5
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+
+    def start(self):
+        self.queue = asyncio.Queue(maxsize=self.max_pending)
+        self.task = asyncio.create_task(self.run())
+
+    async def submit(self, record: dict):
+        # A dead writer would never drain the queue; don't let log_event wait on it
+        if self.task is None or self.task.done():
+            self.dropped += 1
+            return
+        await self.queue.put(record)
+
+    async def run(self):
+        stopping = False
+        while not stopping:
+            record = await self.queue.get()
+            if record is None:
+                return
+
+            batch = [record]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    await asyncio.sleep(min(0.05, remaining))
+                    continue
+                if record is None:
+                    stopping = True
+                    break
+                batch.append(record)
+            await self.write(batch)
+
+    async def write(self, batch: List[dict]):
+        for attempt in range(self.retries + 1):
+            try:
+                lines = "".join(json.dumps(record) + "\n" for record in batch)
+                # File I/O blocks; keep it off the event loop
+                await asyncio.get_running_loop().run_in_executor(None, self._append, lines)
+                self.written += len(batch)
+                return
+            except Exception as e:
+                if attempt == self.retries:
+                    self.dropped += len(batch)
+                    print(f"Event log journal: dropped {len(batch)} entries, writing {self.path} failed: {e}")
+                    return
+                await asyncio.sleep(self.retry_delay * 2 ** attempt)
+
+    def _append(self, lines: str):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def stop(self):
+        """Flush everything still queued; called on shutdown"""
+        if self.task is None:
+            return
+        if not self.task.done():
+            await self.queue.put(None)
+        await asyncio.gather(self.task, return_exceptions=True)
+        self.task = None
+
+
+def read_event_journal(path: str) -> Iterator[dict]:
+    """Records from a journal file, skipping a torn last line from a crash"""
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
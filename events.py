@@ -0,0 +1,93 @@
+# events.py
+import asyncio
+import json
+from typing import Dict, Iterable, Optional, Set
+
+ADMIN_ROOM = "admin"
+
+
+class Message:
+    """One published event, serialized once and shared by every subscriber"""
+
+    __slots__ = ("event", "data", "_sse", "_ws")
+
+    def __init__(self, event: str, data):
+        self.event = event
+        self.data = json.dumps(data)
+        self._sse = None
+        self._ws = None
+
+    @property
+    def sse(self) -> str:
+        if self._sse is None:
+            self._sse = f"event: {self.event}\ndata: {self.data}\n\n"
+        return self._sse
+
+    @property
+    def ws(self) -> str:
+        if self._ws is None:
+            self._ws = f'{{"event": {json.dumps(self.event)}, "data": {self.data}}}'
+        return self._ws
+
+
+def format_sse(event: str, data) -> str:
+    """Serialize one Server-Sent Events frame"""
+    return Message(event, data).sse
+
+
+class EventBroker:
+    """Fan out state changes to per-room subscribers, one bounded queue per connection"""
+
+    def __init__(self, rooms: Iterable[str], queue_size: int = 32):
+        self.queue_size = queue_size
+        self.rooms: Dict[str, Set[asyncio.Queue]] = {room: set() for room in rooms}
+
+    def subscribe(self, room: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.rooms[room].add(queue)
+        return queue
+
+    def unsubscribe(self, room: str, queue: asyncio.Queue):
+        self.rooms.get(room, set()).discard(queue)
+
+    def has_subscribers(self) -> bool:
+        return any(self.rooms.values())
+
+    def publish(self, room: str, event: str, data):
+        """Push an event to every connection in one room"""
+        self.publish_many([room], event, data)
+
+    def publish_many(self, rooms: Iterable[str], event: str, data):
+        """Push the same event to several rooms, serialized once"""
+        message = Message(event, data)
+        for room in rooms:
+            self._deliver(self.rooms.get(room, ()), message)
+
+    def publish_all(self, event: str, data):
+        self.publish_many(list(self.rooms), event, data)
+
+    def close(self):
+        """End every subscriber's stream: each queue gets None, which readers take as the end"""
+        for room, queues in self.rooms.items():
+            self._deliver(queues, None)
+            queues.clear()
+
+    def _deliver(self, queues, message: Optional[Message]):
+        for queue in list(queues):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Slow client: drop its oldest message instead of blocking the publisher
+                queue.get_nowait()
+                queue.put_nowait(message)
+
+
+async def drain_to_websocket(queue: asyncio.Queue, websocket):
+    """Forward queued messages to one WebSocket; only this connection waits on a slow client"""
+    while True:
+        message = await queue.get()
+        if message is None:
+            # Session closed: going away
+            await websocket.close(code=1001)
+            return
+        await websocket.send_text(message.ws)
@@ -0,0 +1,267 @@
+# gateway.py
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from balancer import BackendPool
+from batcher import MicroBatcher
+
+# Request fields that change what the model generates; everything else is ignored for the cache key
+SAMPLING_PARAMS = (
+    "temperature", "top_p", "top_k", "max_tokens", "n", "stop", "seed",
+    "presence_penalty", "frequency_penalty", "repetition_penalty", "response_format", "tools", "tool_choice"
+)
+
+
+def normalize_content(content):
+    """Message content with whitespace collapsed, so re-pasted prompts hit the same entry"""
+    if isinstance(content, str):
+        return " ".join(content.split())
+    if isinstance(content, list):
+        return [
+            {**part, "text": " ".join(part["text"].split())} if isinstance(part, dict) and isinstance(part.get("text"), str) else part
+            for part in content
+        ]
+    return content
+
+
+def payload_error(kind: str, payload) -> Optional[str]:
+    """Why a request body can't be served, or None; the rest of the gateway assumes this shape"""
+    if not isinstance(payload, dict):
+        return "Body must be a JSON object"
+    if kind == "chat":
+        messages = payload.get("messages")
+        if not isinstance(messages, list) or not all(isinstance(m, dict) for m in messages):
+            return "messages must be a list of message objects"
+    else:
+        prompt = payload.get("prompt")
+        if not isinstance(prompt, str) and not (isinstance(prompt, list) and all(isinstance(p, str) for p in prompt)):
+            return "prompt must be a string or a list of strings"
+    return None
+
+
+def cache_key(payload: dict) -> str:
+    """Model + normalized messages or prompt + sampling params, as one canonical string"""
+    messages = [
+        {"role": m.get("role"), "content": normalize_content(m.get("content"))}
+        for m in payload.get("messages", [])
+    ]
+    prompt = payload.get("prompt")
+    prompt = [normalize_content(p) for p in prompt] if isinstance(prompt, list) else normalize_content(prompt)
+    params = {name: payload[name] for name in SAMPLING_PARAMS if name in payload}
+    return json.dumps([payload.get("model"), messages, prompt, params], sort_keys=True, separators=(",", ":"))
+
+
+def batch_key(kind: str, payload: dict) -> Optional[str]:
+    """Requests with equal keys can share one upstream call; None when this one can't be batched.
+
+    Only legacy completions take a list of prompts, and only with one choice
+    per prompt can the answers be told apart again.
+    """
+    if kind != "completions" or not isinstance(payload.get("prompt"), str) or payload.get("n", 1) != 1:
+        return None
+    rest = {name: value for name, value in payload.items() if name not in ("prompt", "user")}
+    return json.dumps(rest, sort_keys=True, separators=(",", ":"))
+
+
+class CompletionCache:
+    """LRU of finished completions, each kept for ``ttl`` seconds"""
+
+    def __init__(self, max_entries: int = 512, ttl: float = 600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, value: dict):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+class CompletionGateway:
+    """OpenAI-compatible completions in front of a team pool, cached, coalesced and batched.
+
+    A burst of identical prompts costs one upstream generation: the first
+    request goes upstream, the rest wait on its result, and later repeats are
+    answered from the cache until the entry expires. Distinct legacy
+    completions that do go upstream pass through the team's MicroBatcher;
+    chat completions take one conversation per call and go straight up.
+    Batching only reaches callers of this API (and advice pre-generation),
+    not chats typed into Open WebUI through the proxy.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        api_key: str = None,
+        cache: CompletionCache = None,
+        timeout: float = 300.0,
+        completions_path: str = "ollama/v1/completions",
+        batch_window: float = 0.02,
+        max_batch: int = 16
+    ):
+        # Upstream paths per request kind: chat completions and legacy (prompt) completions
+        self.paths = {"chat": path.strip("/"), "completions": completions_path.strip("/")}
+        self.api_key = api_key
+        self.cache = cache or CompletionCache()
+        self.timeout = timeout
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.client: Optional[httpx.AsyncClient] = None
+        self.inflight: Dict[str, asyncio.Future] = {}
+        self.batchers: Dict[str, MicroBatcher] = {}
+        self.coalesced = 0
+        # Turned off when the upstream rejects a list of prompts
+        self.batching = True
+
+    def start(self, client: httpx.AsyncClient):
+        # Share the proxy's connection pool
+        self.client = client
+
+    async def stop(self):
+        for batcher in self.batchers.values():
+            await batcher.stop()
+
+    def batcher(self, team: str, pool: BackendPool) -> MicroBatcher:
+        batcher = self.batchers.get(team)
+        if batcher is None:
+            batcher = self.batchers[team] = MicroBatcher(
+                partial(self.post_one, pool), partial(self.post_batch, pool), self.batch_window, self.max_batch
+            )
+        return batcher
+
+    async def complete(
+        self, team: str, pool: BackendPool, payload: dict, kind: str = "chat", authorization: str = None
+    ) -> Tuple[int, dict, str]:
+        """(status, completion, cache outcome) where outcome is hit, miss, coalesced or bypass; kind is chat or completions.
+
+        With ``authorization`` the caller's own credentials go upstream instead
+        of the server key, and the request skips the cache: only the upstream
+        can tell whether those credentials may see an answer.
+        """
+        # Streaming is answered from the same cached completion; upstream always gets a plain request
+        payload = {**payload, "stream": False}
+        if authorization:
+            status, body = await self.post(pool, self.paths[kind], payload, authorization)
+            return status, body, "bypass"
+        key = f"{team}:{kind}:{cache_key(payload)}"
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            return 200, cached, "hit"
+
+        future = self.inflight.get(key)
+        if future is None:
+            outcome = "miss"
+            future = self.inflight[key] = asyncio.ensure_future(self.generate(key, team, pool, kind, payload))
+        else:
+            outcome = "coalesced"
+            self.coalesced += 1
+        # shield: one waiter disconnecting must not cancel the generation the others share
+        status, body = await asyncio.shield(future)
+        return status, body, outcome
+
+    async def generate(self, key: str, team: str, pool: BackendPool, kind: str, payload: dict) -> Tuple[int, dict]:
+        request = {"kind": kind, "payload": payload}
+        try:
+            group = batch_key(kind, payload) if self.batching else None
+            if group is None:
+                # Nothing to batch it with, so no point waiting out the window
+                status, body = await self.post_one(pool, request)
+            else:
+                status, body = await self.batcher(team, pool).submit(request, group)
+            if status == 200:
+                self.cache.put(key, body)
+            return status, body
+        finally:
+            del self.inflight[key]
+
+    async def post_one(self, pool: BackendPool, request: dict) -> Tuple[int, dict]:
+        return await self.post(pool, self.paths[request["kind"]], request["payload"])
+
+    async def post_batch(self, pool: BackendPool, requests: List[dict]) -> List[Tuple[int, dict]]:
+        """One legacy completions call for several prompts, split back into one answer per prompt"""
+        payloads = [request["payload"] for request in requests]
+        status, body = await self.post(pool, self.paths["completions"], {**payloads[0], "prompt": [p["prompt"] for p in payloads]})
+        if status != 200:
+            if 400 <= status < 500 and self.batching:
+                # e.g. Ollama's /v1/completions only takes a string prompt
+                self.batching = False
+                print(f"Gateway batching disabled: upstream rejected a batch with HTTP {status}")
+            # Each caller gets its own answer rather than the batch's error
+            return list(await asyncio.gather(*(self.post_one(pool, request) for request in requests)))
+
+        choices = {choice.get("index", i): choice for i, choice in enumerate(body.get("choices", []))}
+        # Usage covers the whole batch, so it is left out of the per-prompt answers
+        rest = {name: value for name, value in body.items() if name not in ("choices", "usage")}
+        results = []
+        for i in range(len(payloads)):
+            if i in choices:
+                results.append((200, {**rest, "choices": [{**choices[i], "index": 0}]}))
+            else:
+                results.append((502, {"error": {"message": "Batch answer is missing this prompt"}}))
+        return results
+
+    async def post(self, pool: BackendPool, path: str, payload: dict, authorization: str = None) -> Tuple[int, dict]:
+        backend = pool.acquire()
+        if backend is None:
+            return 503, {"error": {"message": "No AI system available for this team"}}
+
+        if authorization:
+            headers = {"Authorization": authorization}
+        else:
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        try:
+            response = await self.client.post(
+                f"{backend.url.rstrip('/')}/{path}", json=payload, headers=headers, timeout=self.timeout
+            )
+        except httpx.HTTPError as e:
+            backend.breaker.failure()
+            return 502, {"error": {"message": f"Team AI system unreachable: {type(e).__name__}"}}
+        finally:
+            pool.release(backend)
+
+        if response.status_code >= 500:
+            backend.breaker.failure()
+        else:
+            backend.breaker.success()
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            return 502, {"error": {"message": "Team AI system returned a non-JSON answer"}}
+
+
+def stream_completion(completion: dict):
+    """A finished completion replayed as OpenAI streaming SSE frames (chat chunks, or text for legacy completions)"""
+    base = {"id": completion.get("id"), "created": completion.get("created"), "model": completion.get("model")}
+    for choice in completion.get("choices", []):
+        index, finish_reason = choice.get("index", 0), choice.get("finish_reason", "stop")
+        if "text" in choice:
+            chunk = {**base, "object": "text_completion", "choices": [{"index": index, "text": choice["text"], "finish_reason": finish_reason}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+            continue
+        message = choice.get("message") or {}
+        content = {"role": message.get("role", "assistant"), "content": message.get("content", "")}
+        for delta, finish in ((content, None), ({}, finish_reason)):
+            chunk = {**base, "object": "chat.completion.chunk", "choices": [{"index": index, "delta": delta, "finish_reason": finish}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
@@ -0,0 +1,117 @@
+# health.py
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from balancer import Backend, BackendPool
+from tracing import Tracer
+
+
+class HealthProber:
+    """Background health checks for every backend in the team pools.
+
+    One keep-alive client is shared by every probe, so a check reuses the
+    open connection instead of a fresh TCP/TLS handshake. Results are stored
+    on the backends: /health/{team} reads them without waiting on the
+    instance, and the pools stop routing to backends that fail.
+    """
+
+    def __init__(self, pools: Dict[str, BackendPool], interval: float = 15.0, timeout: float = 5.0, tracer: Tracer = None):
+        self.pools = pools
+        self.interval = interval
+        self.timeout = timeout
+        self.tracer = tracer
+        self.client: Optional[httpx.AsyncClient] = None
+        self.task: Optional[asyncio.Task] = None
+        self.changed: Optional[asyncio.Event] = None
+
+    def start(self):
+        limits = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+        self.client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=limits,
+            transport=self.tracer.transport(limits=limits) if self.tracer else None
+        )
+        self.changed = asyncio.Event()
+        self.task = asyncio.create_task(self.run())
+
+    def wake(self):
+        """Probe again now, e.g. after the endpoints changed"""
+        if self.changed:
+            self.changed.set()
+
+    def report(self, team: str) -> dict:
+        """Cached health of a team: online while any of its backends is"""
+        backends = self.pools[team].backends
+        if not backends:
+            return {"team": team, "status": "unconfigured"}
+        if all(backend.healthy is None for backend in backends):
+            return {"team": team, "status": "unknown"}
+
+        healthy = [backend for backend in backends if backend.healthy]
+        result = {"team": team, "status": "online" if healthy else "offline"}
+        if healthy:
+            fastest = min(healthy, key=lambda backend: backend.latency)
+            result["code"] = fastest.code
+            result["latency_ms"] = round(fastest.latency * 1000, 1)
+        result["backends"] = [backend.describe() for backend in backends]
+        return result
+
+    async def measure(self, url: str) -> Optional[float]:
+        """Seconds for url to answer, or None if it is down or returning 5xx"""
+        started = time.perf_counter()
+        try:
+            response = await self.client.get(url)
+        except Exception:
+            # Not only HTTPError: a malformed URL raises InvalidURL
+            return None
+        if response.status_code >= 500:
+            return None
+        return time.perf_counter() - started
+
+    async def probe(self, backend: Backend):
+        started = time.perf_counter()
+        try:
+            response = await self.client.get(backend.url)
+            backend.code = response.status_code
+            backend.latency = time.perf_counter() - started
+            backend.error = None
+            backend.healthy = response.status_code < 500
+        except Exception as e:
+            # Not only HTTPError: a malformed URL (no port mapped on Vast.ai) raises InvalidURL
+            backend.code = None
+            backend.latency = None
+            backend.error = type(e).__name__
+            backend.healthy = False
+        backend.checked_at = time.time()
+
+    async def probe_all(self) -> List[dict]:
+        """Probe every backend at once; a dead instance costs one timeout, not one per backend"""
+        await asyncio.gather(*(self.probe(backend) for pool in self.pools.values() for backend in pool.backends))
+        return [self.report(team) for team in self.pools]
+
+    async def run(self):
+        while True:
+            try:
+                await self.probe_all()
+            except Exception as e:
+                # One bad round must not end health checks for every team
+                print(f"Health check round failed: {type(e).__name__}: {e}")
+            try:
+                await asyncio.wait_for(self.changed.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self.changed.clear()
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+        await self.client.aclose()
@@ -1,25 +1,61 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
-import httpx
+from fastapi import FastAPI, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+import asyncio
 import os
 from dotenv import load_dotenv
 from datetime import datetime
-from typing import Dict, List
+from html import escape as html_escape
+from typing import Dict, List, Optional
+import csv
+import io
 import json
+import secrets
 from vastai_sdk import VastAI
+from advice import AdviceStore
+from balancer import BackendPool
 from config import DEMO_MODE
+from discovery import Candidate, InstanceDiscovery, assign_teams, model_keywords
+from eventlog import EventLogWriter, read_event_journal
+from events import ADMIN_ROOM, drain_to_websocket, format_sse
+from gateway import CompletionCache, CompletionGateway, payload_error, stream_completion
+from health import HealthProber
+from metrics import MetricsMiddleware, RequestMetrics, family
+from profiler import ProfilerMiddleware, RequestProfiler
+from proxy import HEDGE_PATHS, UpstreamProxy
+from scenarios import ScenarioIndex
+from sessions import DEFAULT_SESSION, Session, SessionStore, session_key
+from rendercache import RenderCache
+from state import backend_from_url
+from timeline import Timeline
+from tracing import RequestIdMiddleware, Tracer
 import time
 
-last_crisis_time = 0
+# Default crisis timer for new sessions
 countdown_duration = 120
+# Longest a /current_crisis?since= long poll is held open, in seconds
+LONG_POLL_MAX = 55
 load_dotenv()
 app = FastAPI()
-
-event_log: Dict[str, List] = {
-    "usa": [],
-    "china": [],
-    "neutral": []
-}
+render_cache = RenderCache()
+
+# Per-route request counts, latency histograms and in-flight gauges, served at /metrics
+request_metrics = RequestMetrics()
+app.add_middleware(MetricsMiddleware, metrics=request_metrics)
+# On-demand profiling started from /admin/profile; idle unless a run is in progress
+profiler = RequestProfiler(exclude="/admin/profile")
+app.add_middleware(ProfilerMiddleware, profiler=profiler)
+# Spans for outbound calls (Vast.ai, health probes, team AI traffic), tagged with the
+# X-Request-ID of the request that caused them and shown at /admin/traces.
+# TRACE_EXPORT_PATH: also append them to this file as OTLP/JSON
+tracer = Tracer(int(os.environ.get("TRACE_BUFFER_SIZE", "2000")), os.environ.get("TRACE_EXPORT_PATH") or None)
+app.add_middleware(RequestIdMiddleware)
+
+# memory:// (single worker), sqlite:///state.db or redis://host:6379/0
+state = backend_from_url(os.environ.get("STATE_BACKEND"))
+
+# Write-behind journal so a restart mid-class keeps the event log; durable backends already do
+EVENT_LOG_PATH = os.environ.get("EVENT_LOG_PATH", "event_log.jsonl")
+event_journal = EventLogWriter(EVENT_LOG_PATH) if EVENT_LOG_PATH and not state.durable else None
 
 # Vast.ai API key
 VAST_API_KEY = os.environ.get("VAST_API_KEY")
@@ -36,30 +72,149 @@ TEAM_ENDPOINTS = {
 
 demo_settings = DEMO_MODE["30_MIN"]
 
+# Every instance serving each team; the *_WEBUI_URL variables may list several, comma-separated.
+# TEAM_ENDPOINTS keeps the first (fastest, once discovered) for display
+TEAM_POOLS = {
+    team: BackendPool(u.strip() for u in (url or "").split(",") if u.strip())
+    for team, url in TEAM_ENDPOINTS.items()
+}
+for team, pool in TEAM_POOLS.items():
+    TEAM_ENDPOINTS[team] = pool.urls[0] if pool.urls else None
+
+# Backend health is probed in the background; /health/{team} reads the cached result
+# and the pools stop routing to backends that fail
+health = HealthProber(TEAM_POOLS, interval=float(os.environ.get("HEALTH_CHECK_INTERVAL", "15")), tracer=tracer)
+
 @app.on_event("startup")
 async def configure_demo():
     global news_interval
     news_interval = demo_settings["news_interval"]
+    # The default session's clock starts when the server is ready to serve dashboards
+    await open_session(DEFAULT_SESSION, existing=True)
+
+@app.on_event("startup")
+async def start_event_journal():
+    """Reload the journal into the state backend, then start batching new entries"""
+    if not event_journal:
+        return
+
+    # Closing a session retires its entries so far; find where each session last did
+    retired = {}
+    for line, record in enumerate(read_event_journal(EVENT_LOG_PATH)):
+        if record.get("closed"):
+            retired[record.get("session", DEFAULT_SESSION)] = line
+
+    restored = 0
+    for line, record in enumerate(read_event_journal(EVENT_LOG_PATH)):
+        session_id = record.pop("session", DEFAULT_SESSION)
+        if record.get("closed") or line <= retired.get(session_id, -1):
+            continue
+        team = record.pop("team", None)
+        await state.rpush(session_key(session_id, "events", team), json.dumps(record))
+        restored += 1
+    print(f"Restored {restored} event log entries from {EVENT_LOG_PATH}")
+    event_journal.start()
+
+# Student traffic to the team AI systems goes through here instead of straight to Vast.ai.
+# HEDGE_DELAY: seconds before a slow request is duplicated to a second instance
+# (unset: the team's recent p95, 0: never)
+# HEDGE_PATHS: comma-separated POST paths that are safe to send twice (GET/HEAD/OPTIONS always are)
+team_proxy = UpstreamProxy(
+    hedge_delay=float(os.environ["HEDGE_DELAY"]) if os.environ.get("HEDGE_DELAY") else None,
+    hedge_paths=[p for p in os.environ["HEDGE_PATHS"].split(",") if p.strip()] if os.environ.get("HEDGE_PATHS") else HEDGE_PATHS,
+    tracer=tracer
+)
+
+@app.on_event("startup")
+async def start_tracing():
+    tracer.start()
+
+@app.on_event("startup")
+async def start_health_checks():
+    health.start()
+
+# OpenAI-compatible endpoint per team that caches completions, merges duplicate prompts
+# and micro-batches the rest. Open WebUI serves chat completions at api/chat/completions
+# behind an API key, and legacy completions (which accept a batch of prompts) via Ollama.
+# Callers presenting GATEWAY_TOKEN get the server's GATEWAY_API_KEY and the cache; any
+# other bearer (a student's Open WebUI key) is passed upstream as-is, uncached
+GATEWAY_TOKEN = os.environ.get("GATEWAY_TOKEN")
+gateway = CompletionGateway(
+    os.environ.get("GATEWAY_UPSTREAM_PATH", "api/chat/completions"),
+    os.environ.get("GATEWAY_API_KEY"),
+    CompletionCache(ttl=float(os.environ.get("GATEWAY_CACHE_TTL", "600"))),
+    completions_path=os.environ.get("GATEWAY_COMPLETIONS_PATH", "ollama/v1/completions"),
+    batch_window=float(os.environ.get("GATEWAY_BATCH_WINDOW_MS", "20")) / 1000,
+    max_batch=int(os.environ.get("GATEWAY_MAX_BATCH", "16"))
+)
+
+# Model id each team's gateway requests name
+TEAM_MODEL_NAMES = {
+    "usa": os.environ.get("USA_MODEL", "llama2:70b"),
+    "china": os.environ.get("CHINA_MODEL", "deepseek-llm:67b"),
+    "neutral": os.environ.get("NEUTRAL_MODEL", "yi:34b")
+}
 
-async def get_vast_instances():
-    """Fetch running instances from Vast.ai SDK"""
+async def generate_advice(team: str, crisis):
+    """Ask a team's model for its take on a crisis, through the caching gateway"""
+    payload = {
+        "model": TEAM_MODEL_NAMES[team],
+        "messages": [{"role": "user", "content": f"{crisis.description}\n\n{crisis.prompt}"}]
+    }
+    status, completion, _ = await gateway.complete(team, TEAM_POOLS[team], payload)
+    if status != 200:
+        raise RuntimeError(completion.get("error", {}).get("message", f"HTTP {status}"))
+    return completion["choices"][0]["message"]["content"]
+
+# Crisis answers generated the moment a crisis activates, shown on the dashboard
+advice = AdviceStore(state, generate_advice)
+
+@app.on_event("startup")
+async def start_team_proxy():
+    team_proxy.start()
+    gateway.start(team_proxy.client)
+
+@app.on_event("shutdown")
+async def stop_health_checks():
+    await health.stop()
+
+@app.on_event("shutdown")
+async def stop_team_proxy():
+    await gateway.stop()
+    await team_proxy.stop()
+
+@app.on_event("shutdown")
+async def stop_tracing():
+    await tracer.stop()
+
+@app.on_event("shutdown")
+async def close_state():
+    """Stop everything that reads or writes the state backend, then close it"""
+    await discovery.stop()
+    await sessions.stop()
+    if event_journal:
+        await event_journal.stop()
+    await state.close()
+
+def fetch_vast_instances():
+    """Fetch running instances from Vast.ai SDK; blocking, so run it through discovery"""
     if not VAST_API_KEY:
         print("No VAST_API_KEY found")
         return None
 
     try:
         vast = VastAI(api_key=VAST_API_KEY)
-        instances = vast.show_instances()
+        with tracer.span("vastai.show_instances", **{"server.address": "console.vast.ai"}):
+            instances = vast.show_instances()
         print(f"SDK response: {instances}")
 
         # Filter for running instances
         running = [i for i in instances if i.get('actual_status') == 'running']
         print(f"Found {len(running)} running instances")
 
-        # Map instances to teams
-        team_instances = {}
-        for idx, instance in enumerate(running[:3]):
-            team = ["usa", "china", "neutral"][idx]
+        # Every running instance is a candidate; assign_vast_instances picks the teams
+        candidates = []
+        for instance in running:
             ip = instance.get('public_ipaddr')
 
             # Extract port - Vast returns ports as dict like {'3000/tcp': [external_port]}
@@ -69,21 +224,52 @@ async def get_vast_instances():
                 port = ports['7500/tcp'][0]['HostPort'] if isinstance(ports['7500/tcp'], list) else ports['7500/tcp']
 
             if ip:
-                team_instances[team] = f"http://{ip}:{port}"
-                print(f"Mapped {team} to {ip}:{port}")
+                tags = f"{instance.get('label') or ''} {instance.get('image_uuid') or ''}"
+                candidates.append(Candidate(str(instance.get('id')), f"http://{ip}:{port}", tags))
 
-        return team_instances
+        return candidates
     except Exception as e:
         print(f"SDK error: {e}")
         print(f"Error type: {type(e)}")
         return None
 
+# Label or image words that mark an instance as a team's model: the team name and the
+# model it is configured to ask for, so discovery and advice agree on which box has it
+TEAM_MODELS = {team: (team, *model_keywords(model)) for team, model in TEAM_MODEL_NAMES.items()}
+# Instances slower than this to answer a probe are not given a team
+MAX_PROBE_LATENCY = 2.0
+
+async def assign_vast_instances(candidates: List[Candidate]):
+    """Probe every candidate at once and give each team its healthy matches, fastest first"""
+    latencies = await asyncio.gather(*(health.measure(candidate.url) for candidate in candidates))
+    for candidate, latency in zip(candidates, latencies):
+        print(f"Instance {candidate.id} at {candidate.url}: " + (f"{latency * 1000:.0f} ms" if latency is not None else "unhealthy"))
+
+    pools = assign_teams(candidates, latencies, TEAM_MODELS, MAX_PROBE_LATENCY)
+    team_instances = {team: urls for team, urls in pools.items() if urls}
+    for team, urls in team_instances.items():
+        print(f"Mapped {team} to {', '.join(urls)}")
+    return team_instances
+
+def update_endpoints(instances: Dict[str, List[str]]):
+    """Publish new team backend pools and drop pages rendered with the old ones"""
+    for team, urls in instances.items():
+        TEAM_POOLS[team].update(urls)
+        TEAM_ENDPOINTS[team] = urls[0]
+    render_cache.invalidate()
+    health.wake()
+
+# Vast.ai lookups run in a worker thread, cached and refreshed in the background
+discovery = InstanceDiscovery(
+    fetch_vast_instances, assign_vast_instances, update_endpoints,
+    interval=float(os.environ.get("VAST_REFRESH_INTERVAL", "300"))
+)
+
 @app.on_event("startup")
 async def refresh_endpoints():
-    """Update endpoints from Vast.ai on startup"""
-    instances = await get_vast_instances()
-    if instances:
-        TEAM_ENDPOINTS.update(instances)
+    """Keep endpoints in sync with Vast.ai without holding up startup"""
+    if VAST_API_KEY:
+        discovery.start()
 
 @app.get("/api/refresh-instances")
 async def refresh_instances(token: str = None):
@@ -91,15 +277,22 @@ async def refresh_instances(token: str = None):
     if token != ADMIN_TOKEN:
         return {"error": "Unauthorized"}
 
-    instances = await get_vast_instances()
+    # A manual refresh must go to Vast.ai, not return the cached list
+    instances = await discovery.get(max_age=0)
     if instances:
-        TEAM_ENDPOINTS.update(instances)
-        return {"status": "updated", "endpoints": TEAM_ENDPOINTS}
+        return {
+            "status": "updated",
+            "endpoints": TEAM_ENDPOINTS,
+            "pools": {team: pool.urls for team, pool in TEAM_POOLS.items()}
+        }
     return {"error": "Failed to fetch instances"}
 
 @app.get("/")
-async def home():
-    return HTMLResponse("""
+async def home(request: Request):
+    return render_cache.respond(request, "home", render_home)
+
+def render_home():
+    return """
     <html>
     <head>
         <style>
@@ -146,11 +339,18 @@ async def home():
         </div>
     </body>
     </html>
-    """)
+    """
 
 @app.get("/news_ticker")
-async def news_ticker_page():
-    return HTMLResponse("""
+async def news_ticker_page(request: Request, session: str = DEFAULT_SESSION):
+    if not await load_session(session):
+        return HTMLResponse("Unknown session", status_code=404)
+
+    # The page reads ?session= itself, so one copy serves every session
+    return render_cache.respond(request, "news_ticker", render_news_ticker)
+
+def render_news_ticker():
+    return """
     <html>
     <head>
         <style>
@@ -206,9 +406,15 @@ async def news_ticker_page():
         <div id="news-container"></div>
 
         <script>
+        let lastNewsId = null;
+
         async function fetchNews() {
-            const response = await fetch('/news_feed');
+            // Same ?session= as this page
+            const response = await fetch('/news_feed' + location.search);
             const data = await response.json();
+            // Polls return the same item until the timeline moves on
+            if (data.id === lastNewsId) return;
+            lastNewsId = data.id;
 
             document.getElementById('month').textContent = data.month.toUpperCase();
 
@@ -231,11 +437,7 @@ async def news_ticker_page():
         </script>
     </body>
     </html>
-    """)
-
-current_month = "January 2026"
-news_index = 0
-triggered_crises = set()
+    """
 
 # Crisis bank definition
 crisis_bank = [
@@ -428,85 +630,294 @@ news_timeline = {
     ]
 }
 
-# Current crisis state
-active_crises = {
-    "usa": None,
-    "china": None,
-    "neutral": None
-}
+# Compiled once; every session forks its own clock from this template
+timeline = Timeline(news_timeline, demo_settings["news_interval"])
+scenarios = ScenarioIndex(crisis_bank, timeline)
+sessions = SessionStore(timeline, TEAM_ENDPOINTS)
 
-@app.get("/news_feed")
-async def get_news_feed():
-    global news_index, current_month, last_crisis_time, triggered_crises
+@app.on_event("startup")
+async def report_scenarios():
+    """Surface scenario data problems at boot instead of as silent no-ops mid-class"""
+    problems = scenarios.report()
+    print(f"Scenario index: {len(scenarios.crises)} crises, {len(scenarios.triggers)} news triggers, {len(problems)} problems")
+    for problem in problems:
+        print(f"  {problem}")
+
+async def open_session(session_id: str = None, existing: bool = False) -> Session:
+    """Create a session, or attach to one another worker created, and start its clock"""
+    session = sessions.create(session_id, news_interval)
+    created = await state.setnx(f"session:{session.id}", "open")
+    if not created and not existing:
+        if await state.get(f"session:{session.id}") != "closed":
+            sessions.close(session.id)
+            raise ValueError("Session already exists")
+        # Reusing a closed id starts a fresh game, not where the last class stopped
+        await clear_session_state(session)
+        await state.set(f"session:{session.id}", "open")
+        created = True
+    if created:
+        # Every worker lists sessions from here, not from its own handles
+        await state.rpush("sessions", session.id)
+
+    # First worker to open the session fixes its timer and clock for everyone
+    await state.setnx(session.key("countdown"), str(countdown_duration))
+    await state.setnx(session.key("timeline_start"), repr(session.timeline.start))
+    session.timeline.reset(start=float(await state.get(session.key("timeline_start"))))
+
+    session.pump = asyncio.create_task(timeline_pump(session))
+    if state.shared:
+        session.watcher = asyncio.create_task(watch_state(session))
+    return session
+
+async def clear_session_state(session: Session):
+    """Drop a closed session's clock, crises and event log so its id can be opened again"""
+    keys = [session.key("countdown"), session.key("timeline_start"), session.key("last_crisis_time")]
+    keys += [session.key(part, team) for team in session.teams for part in ("crisis", "events")]
+    keys += [session.key("triggered", crisis_id) for crisis_id in scenarios.crises]
+    await state.delete(keys)
+    await journal_session_closed(session.id)
+    # Versions only ever grow, so long polls and other workers' watchers see the reset
+    for team in session.teams:
+        await state.incr(session.key("version", team))
+
+async def journal_session_closed(session_id: str):
+    """Mark the journal so a restart doesn't reload this session's entries so far"""
+    if event_journal:
+        await event_journal.submit({"session": session_id, "closed": True, "timestamp": datetime.now().isoformat()})
+
+async def session_ids() -> List[str]:
+    """Ids of the sessions open in any worker, oldest first"""
+    ids = list(dict.fromkeys([DEFAULT_SESSION] + await state.lrange("sessions")))
+    statuses = await state.mget([f"session:{session_id}" for session_id in ids])
+    return [session_id for session_id, status in zip(ids, statuses) if status == "open"]
+
+async def load_session(session_id: str) -> Optional[Session]:
+    """Session handle for this worker, attaching to sessions opened elsewhere"""
+    session = sessions.get(session_id)
+    if session or not state.shared:
+        return session
+
+    if await state.get(f"session:{session_id}") == "open":
+        try:
+            return await open_session(session_id, existing=True)
+        except ValueError:
+            # Another request in this worker attached first
+            return sessions.get(session_id)
+    return None
 
-    months = list(news_timeline.keys())
-    month_idx = months.index(current_month)
+@app.get("/news_feed")
+async def get_news_feed(request: Request, session: str = DEFAULT_SESSION):
+    """Current news item; 304 while the poller already has it.
+
+    No max-age: /advance_timeline can move the clock at any moment, so the
+    browser revalidates every poll against the item id instead.
+    """
+    game = await load_session(session)
+    if not game:
+        return {"error": "Unknown session"}
+
+    news = game.timeline.current()
+    headers = {"ETag": f'"{game.id}-{news["id"]}"', "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(json.dumps(news), media_type="application/json", headers=headers)
+
+async def fire_trigger(session: Session, news_item):
+    """Activate the crisis a news item points at, respecting the countdown cooldown"""
+    # Dangling triggers were reported at startup and never start a cooldown
+    crisis = scenarios.trigger_for(news_item)
+    if not crisis:
+        return
+
+    last_crisis_time, countdown = await session_clock(session)
+    current_time = time.time()
+    if current_time - last_crisis_time < countdown:
+        return
+
+    # Every worker runs a pump; only the one that claims the trigger fires it
+    if not await state.setnx(session.key("triggered", crisis.id), "1"):
+        return
+
+    await state.set(session.key("last_crisis_time"), repr(current_time))
+    for team in session.teams:
+        await set_crisis(session, team, crisis)
+
+async def timeline_pump(session: Session):
+    """Fire crisis triggers and push news as the session clock reaches each item"""
+    latest_news = None
+    while True:
+        for news_item in session.timeline.due():
+            await fire_trigger(session, news_item)
+
+        news = session.timeline.current()
+        if news is not latest_news:
+            latest_news = news
+            session.broker.publish_all("news", news)
+
+        # Sleep until the next item, or until the admin moves the clock
+        session.timeline_changed.clear()
+        try:
+            await asyncio.wait_for(session.timeline_changed.wait(), timeout=session.timeline.seconds_until_next())
+        except asyncio.TimeoutError:
+            pass
+
+async def watch_state(session: Session, interval: float = 1.0):
+    """Relay changes made by other workers to this worker's streams"""
+    keys = [session.key("version", team) for team in session.teams]
+    keys += [session.key("countdown"), session.key("timeline_start"), f"session:{session.id}"]
+    countdown, timeline_start = None, None
+    while True:
+        *versions, new_countdown, new_start, status = await state.mget(keys)
+
+        if status != "open":
+            sessions.close(session.id)
+            return
+
+        for team, version in zip(session.teams, versions):
+            if version and int(version) > session.versions.get(team, 0):
+                session.versions[team] = int(version)
+                await notify_crisis(session, team)
+
+        if countdown is not None and new_countdown != countdown:
+            session.broker.publish_all("timer", await timer_state(session))
+        countdown = new_countdown
+
+        if new_start != timeline_start:
+            if timeline_start is not None:
+                # Clock moved by another worker; items it skipped never fire here
+                session.timeline.start = float(new_start)
+                session.timeline.fired = session.timeline.index_at()
+                session.timeline_changed.set()
+            timeline_start = new_start
+
+        await asyncio.sleep(interval)
 
-    current_news = news_timeline[current_month]
+@app.post("/advance_timeline")
+async def advance_timeline(token: str, session: str = DEFAULT_SESSION):
+    if token != ADMIN_TOKEN:
+        return {"error": "Unauthorized"}
 
-    if news_index < len(current_news):
-        news_item = current_news[news_index]
-        news_index += 1
+    game = await load_session(session)
+    if not game:
+        return {"error": "Unknown session"}
 
-        # Check if this news triggers a crisis
-        current_time = time.time()
-        if (news_item["trigger"] and
-            news_item["trigger"] not in triggered_crises and
-            current_time - last_crisis_time >= countdown_duration):
+    next_month = game.timeline.advance_month()
+    if next_month:
+        await state.set(game.key("timeline_start"), repr(game.timeline.start))
+        game.timeline_changed.set()
+        return {"status": "advanced", "current_month": next_month}
 
-            triggered_crises.add(news_item["trigger"])
-            last_crisis_time = current_time
+    return {"status": "at_end", "current_month": game.timeline.position()[0]}
 
-            crisis = next((c for c in crisis_bank if c["id"] == news_item["trigger"]), None)
-            if crisis:
-                for team in ["usa", "china", "neutral"]:
-                    active_crises[team] = crisis
+@app.post("/admin/sessions")
+async def create_session(token: str = None, session_id: str = None):
+    """Start a new classroom session alongside the running ones"""
+    if token != ADMIN_TOKEN:
+        return {"error": "Unauthorized"}
 
-        return {
-            "month": current_month,
-            "news": news_item["text"],
-            "id": news_item["id"]
-        }
-    else:
-        # Move to next month
-        if month_idx < len(months) - 1:
-            current_month = months[month_idx + 1]
-            news_index = 0
-            return await get_news_feed()
-        else:
-            return {"month": "December 2026", "news": "AGI IMMINENT - FINAL DECISIONS REQUIRED", "id": "final"}
+    try:
+        game = await open_session(session_id)
+    except ValueError as e:
+        return {"error": str(e)}
+    return {"status": "created", "session": game.id}
 
-@app.post("/advance_timeline")
-async def advance_timeline(token: str):
+@app.get("/admin/sessions")
+async def list_sessions(token: str = None):
     if token != ADMIN_TOKEN:
         return {"error": "Unauthorized"}
 
-    global current_month, news_index
-    months = list(news_timeline.keys())
-    month_idx = months.index(current_month)
+    listed = []
+    for session_id in await session_ids():
+        game = await load_session(session_id)
+        if game:
+            listed.append({"session": game.id, "current_month": game.timeline.position()[0]})
+    return {"sessions": listed}
 
-    if month_idx < len(months) - 1:
-        current_month = months[month_idx + 1]
-        news_index = 0
-        return {"status": "advanced", "current_month": current_month}
+@app.delete("/admin/sessions/{session_id}")
+async def close_session(session_id: str, token: str = None):
+    if token != ADMIN_TOKEN:
+        return {"error": "Unauthorized"}
 
-    return {"status": "at_end", "current_month": current_month}
+    # The session may have been opened by another worker; its watcher there sees the close
+    if session_id == DEFAULT_SESSION or not await load_session(session_id):
+        return {"error": "Unknown session"}
+    sessions.close(session_id)
+    await state.set(f"session:{session_id}", "closed")
+    await journal_session_closed(session_id)
+    return {"status": "closed"}
 
 @app.get("/team/{team}")
 async def team_redirect(team: str):
     if team not in TEAM_ENDPOINTS:
         return HTMLResponse("Invalid team", status_code=404)
 
-    # Redirect to the team's Open WebUI instance
-    return RedirectResponse(url=TEAM_ENDPOINTS[team])
+    # Redirect to the team's Open WebUI instance, served through our own origin
+    return RedirectResponse(url=f"/team/{team}/proxy/")
+
+# Open WebUI is built to live at a site root: its pages load /_app and /static and call /api,
+# /ollama and /openai, so those requests arrive without the /team/{team}/proxy/ prefix
+PROXY_TEAM_COOKIE = "team_proxy"
+PROXY_METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "HEAD"]
+OPENWEBUI_ROOT_PATHS = [
+    "/_app/{path:path}", "/static/{path:path}", "/api/{path:path}", "/ollama/{path:path}", "/openai/{path:path}",
+    "/ws/socket.io/{path:path}", "/auth", "/c/{path:path}", "/workspace/{path:path}",
+    "/manifest.json", "/favicon.png", "/opensearch.xml"
+]
+
+@app.api_route("/team/{team}/proxy/{path:path}", methods=PROXY_METHODS)
+async def team_proxy_route(request: Request, team: str, path: str):
+    """Stream a request to the least busy of the team's Open WebUI instances and its answer back"""
+    if team not in TEAM_POOLS or not TEAM_POOLS[team].backends:
+        return HTMLResponse("Invalid team", status_code=404)
+
+    response = await team_proxy.forward(request, TEAM_POOLS[team], path, f"/team/{team}/proxy")
+    # Open WebUI's frontend calls its API at the site root; remember whose instance this browser uses
+    response.raw_headers.append((b"set-cookie", f"{PROXY_TEAM_COOKIE}={team}; Path=/; HttpOnly; SameSite=Lax".encode()))
+    return response
+
+@app.post("/team/{team}/v1/chat/completions")
+async def team_chat_completions(request: Request, team: str):
+    """OpenAI-compatible chat completions for a team's model, cached and coalesced"""
+    return await gateway_response(request, team, "chat")
+
+@app.post("/team/{team}/v1/completions")
+async def team_completions(request: Request, team: str):
+    """OpenAI-compatible legacy completions; concurrent prompts are batched into one upstream call"""
+    return await gateway_response(request, team, "completions")
+
+async def gateway_response(request: Request, team: str, kind: str):
+    if team not in TEAM_POOLS or not TEAM_POOLS[team].backends:
+        return Response(json.dumps({"error": {"message": "Invalid team"}}), status_code=404, media_type="application/json")
+    authorization = request.headers.get("authorization", "")
+    if not authorization.lower().startswith("bearer ") or not authorization[7:].strip():
+        return Response(json.dumps({"error": {"message": "Missing bearer token"}}), status_code=401, media_type="application/json")
+    try:
+        payload = await request.json()
+    except ValueError:
+        return Response(json.dumps({"error": {"message": "Body must be JSON"}}), status_code=400, media_type="application/json")
+    error = payload_error(kind, payload)
+    if error:
+        return Response(json.dumps({"error": {"message": error}}), status_code=400, media_type="application/json")
+
+    # The server key is only lent to holders of the gateway token
+    trusted = GATEWAY_TOKEN and secrets.compare_digest(authorization[7:].strip(), GATEWAY_TOKEN)
+    status, completion, outcome = await gateway.complete(team, TEAM_POOLS[team], payload, kind, None if trusted else authorization)
+    headers = {"X-Cache": outcome.upper()}
+    if status == 200 and payload.get("stream"):
+        return StreamingResponse(stream_completion(completion), media_type="text/event-stream", headers=headers)
+    return Response(json.dumps(completion), status_code=status, media_type="application/json", headers=headers)
 
 @app.get("/team/{team}/embed")
-async def team_embed(team: str):
+async def team_embed(request: Request, team: str):
     if team not in TEAM_ENDPOINTS:
         return HTMLResponse("Invalid team", status_code=404)
 
+    # Same-origin proxy URL: no mixed-content block inside the HTTPS Canvas page
+    return render_cache.respond(request, ("embed", team), render_team_embed, team)
+
+def render_team_embed(team: str):
     # Embed Open WebUI in iframe for Canvas
-    return HTMLResponse(f"""
+    return f"""
     <html>
     <head>
         <title>Team {team.upper()} AI System</title>
@@ -516,29 +927,159 @@ async def team_embed(team: str):
         </style>
     </head>
     <body>
-        <iframe src="{TEAM_ENDPOINTS[team]}" allow="fullscreen"></iframe>
+        <iframe src="/team/{team}/proxy/" allow="fullscreen"></iframe>
     </body>
     </html>
-    """)
+    """
 
 @app.post("/log_event")
-async def log_event(team: str, event_id: str, event_title: str, response: str = None):
+async def log_event(team: str, event_id: str, event_title: str, response: str = None, session: str = DEFAULT_SESSION):
     """Log which events each team received"""
-    if team in event_log:
-        event_log[team].append({
+    game = await load_session(session)
+    if game and team in game.teams:
+        entry = {
             "timestamp": datetime.now().isoformat(),
             "event_id": event_id,
             "event_title": event_title,
             "response": response
-        })
+        }
+        await state.rpush(game.key("events", team), json.dumps(entry))
+        if event_journal:
+            await event_journal.submit({"session": game.id, "team": team, **entry})
     return {"status": "logged"}
 
+@app.get("/admin/batching")
+async def batching_stats(token: str = None):
+    """Gateway batch sizes and queueing delay per team"""
+    if token != ADMIN_TOKEN:
+        return {"error": "Unauthorized"}
+
+    return {
+        "cache": {"entries": len(gateway.cache.entries), "hits": gateway.cache.hits, "misses": gateway.cache.misses},
+        "coalesced": gateway.coalesced,
+        "teams": {team: batcher.stats() for team, batcher in gateway.batchers.items()}
+    }
+
+# Longest profiling window, in seconds
+PROFILE_MAX_SECONDS = 600
+
+@app.post("/admin/profile")
+async def start_profile(token: str = None, mode: str = "cprofile", requests: int = None, seconds: float = None, route: str = None):
+    """Profile the next N requests or T seconds of them (default 30 s), optionally only one route"""
+    if token != ADMIN_TOKEN:
+        return {"error": "Unauthorized"}
+    if requests is None and seconds is None:
+        seconds = 30
+    if (requests is not None and requests < 1) or (seconds is not None and not 0 < seconds <= PROFILE_MAX_SECONDS):
+        return {"error": f"requests must be at least 1 and seconds between 0 and {PROFILE_MAX_SECONDS}"}
+
+    try:
+        run = profiler.start(mode, requests, seconds, route)
+    except ValueError as e:
+        return {"error": str(e)}
+    return run.describe()
+
+@app.get("/admin/profile")
+async def profile_status(token: str = None):
+    if token != ADMIN_TOKEN:
+        return {"error": "Unauthorized"}
+    if not profiler.last:
+        return {"status": "idle"}
+    return profiler.last.describe()
+
+@app.delete("/admin/profile")
+async def stop_profile(token: str = None):
+    """End the current run early; its results stay downloadable"""
+    if token != ADMIN_TOKEN:
+        return {"error": "Unauthorized"}
+    profiler.finish()
+    return profiler.last.describe() if profiler.last else {"status": "idle"}
+
+@app.get("/admin/profile/download")
+async def download_profile(token: str = None, format: str = None):
+    """Last finished run: pstats (default) or text for cprofile, collapsed stacks for sample"""
+    if token != ADMIN_TOKEN:
+        return {"error": "Unauthorized"}
+    run = profiler.last
+    if not run:
+        return {"error": "No profile recorded"}
+    if not run.finished_at:
+        return {"error": "Profiling still running; wait for it or DELETE /admin/profile"}
+
+    try:
+        body, filename, media_type = run.export(format or ("collapsed" if run.mode == "sample" else "pstats"))
+    except ValueError as e:
+        return {"error": str(e)}
+    return Response(body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.get("/admin/traces")
+async def view_traces(token: str = None, request_id: str = None, limit: int = 200, format: str = "html"):
+    """Recent outbound calls, newest first; ?request_id= narrows to one inbound request"""
+    if token != ADMIN_TOKEN:
+        return {"error": "Unauthorized"}
+
+    spans = tracer.recent(max(1, min(limit, 2000)), request_id)
+    if format == "json":
+        return {"spans": [span.describe() for span in spans]}
+
+    def ms(value):
+        return f"{value * 1000:.1f}" if value is not None else "–"
+
+    rows = []
+    for span in spans:
+        phases = span.phases()
+        status = (span.error or span.attributes.get("http.status_code", "")) if span.duration is not None else "in flight"
+        request_link = (
+            f'<a href="/admin/traces?token={token}&request_id={span.request_id}">{span.request_id}</a>'
+            if span.request_id else "background"
+        )
+        rows.append(f"""<tr class="{'error' if span.error else ''}">
+            <td>{datetime.fromtimestamp(span.start).strftime('%H:%M:%S.%f')[:-3]}</td>
+            <td>{request_link}</td>
+            <td title="{html_escape(str(span.attributes.get('http.url', '')))}">{html_escape(span.name)}</td>
+            <td>{status}</td>
+            <td>{ms(phases['connect'])}</td><td>{ms(phases['tls'])}</td>
+            <td>{ms(phases['ttfb'])}</td><td>{ms(phases['total'])}</td>
+        </tr>""")
+
+    return HTMLResponse(f"""
+    <html>
+    <head>
+        <style>
+            body {{ font-family: Arial; padding: 20px; background: #1a1a1a; color: #fff; }}
+            table {{ border-collapse: collapse; width: 100%; background: #2a2a2a; }}
+            th, td {{ padding: 6px 10px; border-bottom: 1px solid #333; text-align: left; font-size: 0.9em; }}
+            th {{ background: #333; }}
+            td:nth-child(n+5) {{ text-align: right; font-family: monospace; }}
+            tr.error {{ color: #f87171; }}
+            a {{ color: #60a5fa; }}
+        </style>
+    </head>
+    <body>
+        <h1>Outbound Calls{f" for request {html_escape(request_id)}" if request_id else ""}</h1>
+        <button onclick="window.location.reload()">Refresh</button>
+        <button onclick="window.location.href = '/admin/traces?token={token}'">All requests</button>
+        <button onclick="window.location.href = '/admin/traces?token={token}&format=json'">JSON</button>
+        <p>Connect includes DNS resolution and is blank when a pooled connection was reused. Times in ms.</p>
+        <table>
+            <tr><th>Start</th><th>Request</th><th>Call</th><th>Status</th><th>Connect</th><th>TLS</th><th>First byte</th><th>Total</th></tr>
+            {"".join(rows)}
+        </table>
+    </body>
+    </html>
+    """)
+
 @app.get("/admin/event_log")
-async def view_event_log(token: str = None):
+async def view_event_log(token: str = None, session: str = DEFAULT_SESSION):
     """View all team events"""
     if token != ADMIN_TOKEN:
         return {"error": "Unauthorized"}
 
+    game = await load_session(session)
+    if not game:
+        return {"error": "Unknown session"}
+    event_log = await read_event_log(game)
+
     return HTMLResponse(f"""
     <html>
     <head>
@@ -552,28 +1093,98 @@ async def view_event_log(token: str = None):
     <body>
         <h1>Event Log</h1>
         <button onclick="window.location.reload()">Refresh</button>
-        <button onclick="downloadLog()">Download JSON</button>
+        <button onclick="window.location.href = '/admin/event_log.ndjson?token={token}&session={game.id}'">Download NDJSON</button>
+        <button onclick="window.location.href = '/admin/event_log.csv?token={token}&session={game.id}'">Download CSV</button>
 
         <div id="logs">
-            {generate_log_html()}
+            {generate_log_html(event_log)}
         </div>
-
-        <script>
-        function downloadLog() {{
-            const data = {json.dumps(event_log)};
-            const blob = new Blob([JSON.stringify(data, null, 2)], {{type: 'application/json'}});
-            const url = URL.createObjectURL(blob);
-            const a = document.createElement('a');
-            a.href = url;
-            a.download = 'event_log.json';
-            a.click();
-        }}
-        </script>
     </body>
     </html>
     """)
 
-def generate_log_html():
+EXPORT_FIELDS = ["session", "team", "timestamp", "event_id", "event_title", "response"]
+
+async def iter_event_log(session: Session, teams: List[str], since: str = None, until: str = None, chunk: int = 500):
+    """Yield (team, entries) chunks read from the backend a page at a time"""
+    for team in teams:
+        cursor = 0
+        while True:
+            raw, cursor = await state.lscan(session.key("events", team), cursor, chunk)
+            if not raw:
+                break
+
+            entries = [json.loads(entry) for entry in raw]
+            # Timestamps are isoformat strings, so string order is time order
+            if since or until:
+                entries = [
+                    e for e in entries
+                    if (not since or e["timestamp"] >= since) and (not until or e["timestamp"] < until)
+                ]
+            if entries:
+                yield team, entries
+
+async def export_event_log(token: str, session: str, team: str, since: str, until: str, fmt: str):
+    """Validate an export request and stream it as NDJSON or CSV"""
+    if token != ADMIN_TOKEN:
+        return {"error": "Unauthorized"}
+
+    game = await load_session(session)
+    if not game:
+        return {"error": "Unknown session"}
+    if team and team not in game.teams:
+        return {"error": "Invalid team"}
+    try:
+        since = datetime.fromisoformat(since).isoformat() if since else None
+        until = datetime.fromisoformat(until).isoformat() if until else None
+    except ValueError:
+        return {"error": "since/until must be ISO 8601 timestamps"}
+
+    chunks = iter_event_log(game, [team] if team else game.teams, since, until)
+
+    async def ndjson():
+        async for chunk_team, entries in chunks:
+            yield "".join(
+                json.dumps({"session": game.id, "team": chunk_team, **entry}) + "\n" for entry in entries
+            )
+
+    async def csv_rows():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        async for chunk_team, entries in chunks:
+            for entry in entries:
+                writer.writerow({"session": game.id, "team": chunk_team, **entry})
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    filename = f"event_log_{game.id}.{fmt}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if fmt == "csv":
+        return StreamingResponse(csv_rows(), media_type="text/csv", headers=headers)
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson", headers=headers)
+
+@app.get("/admin/event_log.ndjson")
+async def event_log_ndjson(token: str = None, session: str = DEFAULT_SESSION, team: str = None,
+                           since: str = None, until: str = None):
+    """Stream the event log, one JSON object per line"""
+    return await export_event_log(token, session, team, since, until, "ndjson")
+
+@app.get("/admin/event_log.csv")
+async def event_log_csv(token: str = None, session: str = DEFAULT_SESSION, team: str = None,
+                        since: str = None, until: str = None):
+    """Stream the event log as CSV"""
+    return await export_event_log(token, session, team, since, until, "csv")
+
+async def read_event_log(session: Session) -> Dict[str, List]:
+    return {
+        team: [json.loads(entry) for entry in await state.lrange(session.key("events", team))]
+        for team in session.teams
+    }
+
+def generate_log_html(event_log: Dict[str, List]):
     html = ""
     for team, events in event_log.items():
         html += f'<div class="team-log"><h2>Team {team.upper()}</h2>'
@@ -587,12 +1198,25 @@ def generate_log_html():
     return html
 
 @app.get("/admin")
-async def admin_dashboard(request: Request, token: str = None):
+async def admin_dashboard(request: Request, token: str = None, session: str = DEFAULT_SESSION):
     if token != ADMIN_TOKEN:
         return HTMLResponse("Unauthorized", status_code=401)
 
+    game = await load_session(session)
+    if not game:
+        return HTMLResponse("Unknown session", status_code=404)
+    active_crises = {team: (await crisis_state(game, team))["crisis"] for team in game.teams}
+    _, game_countdown = await session_clock(game)
+
     # Get the current app URL from the request
     base_url = str(request.base_url).rstrip('/')
+    current_month, news_index, month_length = game.timeline.position()
+    # Dashboards for the default session keep their original URLs
+    session_query = "" if game.id == DEFAULT_SESSION else f"?session={game.id}"
+    session_links = " ".join(
+        f'<a href="/admin?token={token}&session={other}" style="color: #0f0;">{other}</a>'
+        for other in await session_ids()
+    )
 
     return HTMLResponse(f"""
     <html>
@@ -704,6 +1328,13 @@ async def admin_dashboard(request: Request, token: str = None):
     <body>
         <h1>🎮 Admin Control Center</h1>
 
+        <!-- Session Control -->
+        <div class="section">
+            <h2>🏫 Session: {game.id}</h2>
+            <p>Running sessions: {session_links}</p>
+            <button onclick="createSession()">➕ Start New Session</button>
+        </div>
+
         <!-- Crisis Control Panel -->
         <div class="section">
             <h2>⚡ Crisis Control</h2>
@@ -711,7 +1342,7 @@ async def admin_dashboard(request: Request, token: str = None):
             <!-- Timer Control -->
             <div class="timer-control">
                 <label>Global Crisis Timer (seconds):</label>
-                <input type="number" id="timer-duration" value="{countdown_duration}" min="10" max="600">
+                <input type="number" id="timer-duration" value="{game_countdown}" min="10" max="600">
                 <button onclick="updateTimer()">Update Timer</button>
                 <span id="timer-status"></span>
             </div>
@@ -775,7 +1406,7 @@ async def admin_dashboard(request: Request, token: str = None):
         <div class="section">
             <h2>📅 Timeline Control</h2>
             <p>Current Month: <strong>{current_month}</strong></p>
-            <p>News Index: {news_index} / {len(news_timeline.get(current_month, []))}</p>
+            <p>News Index: {news_index} / {month_length}</p>
             <button onclick="advanceTimeline()">⏭️ Advance to Next Month</button>
             <div id="timeline-status"></div>
         </div>
@@ -784,9 +1415,9 @@ async def admin_dashboard(request: Request, token: str = None):
         <div class="section">
             <h2>🖥️ Instance Status</h2>
             <div class="status">
-                <div class="endpoint"><b>USA:</b> {TEAM_ENDPOINTS['usa'] or 'Not configured'}</div>
-                <div class="endpoint"><b>China:</b> {TEAM_ENDPOINTS['china'] or 'Not configured'}</div>
-                <div class="endpoint"><b>Neutral:</b> {TEAM_ENDPOINTS['neutral'] or 'Not configured'}</div>
+                <div class="endpoint"><b>USA:</b> {', '.join(TEAM_POOLS['usa'].urls) or 'Not configured'}</div>
+                <div class="endpoint"><b>China:</b> {', '.join(TEAM_POOLS['china'].urls) or 'Not configured'}</div>
+                <div class="endpoint"><b>Neutral:</b> {', '.join(TEAM_POOLS['neutral'].urls) or 'Not configured'}</div>
             </div>
             <button onclick="refreshInstances()">🔄 Refresh from Vast.ai</button>
             <div id="refresh-status"></div>
@@ -795,11 +1426,11 @@ async def admin_dashboard(request: Request, token: str = None):
         <!-- Quick Links -->
         <div class="section">
             <h2>🔗 Quick Links</h2>
-            <button onclick="window.open('/dashboard/usa', '_blank')">👁️ View USA Dashboard</button>
-            <button onclick="window.open('/dashboard/china', '_blank')">👁️ View China Dashboard</button>
-            <button onclick="window.open('/dashboard/neutral', '_blank')">👁️ View Neutral Dashboard</button>
-            <button onclick="window.open('/news_ticker', '_blank')">📰 News Ticker</button>
-            <button onclick="window.open('/admin/event_log?token={token}', '_blank')" class="log-button">📊 Event Log</button>
+            <button onclick="window.open('/dashboard/usa{session_query}', '_blank')">👁️ View USA Dashboard</button>
+            <button onclick="window.open('/dashboard/china{session_query}', '_blank')">👁️ View China Dashboard</button>
+            <button onclick="window.open('/dashboard/neutral{session_query}', '_blank')">👁️ View Neutral Dashboard</button>
+            <button onclick="window.open('/news_ticker{session_query}', '_blank')">📰 News Ticker</button>
+            <button onclick="window.open('/admin/event_log?token={token}&session={game.id}', '_blank')" class="log-button">📊 Event Log</button>
         </div>
 
         <!-- Embed URLs -->
@@ -807,9 +1438,9 @@ async def admin_dashboard(request: Request, token: str = None):
             <h2>📋 Canvas Embed URLs</h2>
             <pre id="embed-urls">
 Dashboard URLs:
-USA: {base_url}/dashboard/usa
-China: {base_url}/dashboard/china
-Neutral: {base_url}/dashboard/neutral
+USA: {base_url}/dashboard/usa{session_query}
+China: {base_url}/dashboard/china{session_query}
+Neutral: {base_url}/dashboard/neutral{session_query}
 
 AI System URLs:
 USA: {base_url}/team/usa
@@ -821,6 +1452,7 @@ Neutral: {base_url}/team/neutral
 
         <script>
         const adminToken = '{token}';
+        const sessionId = '{game.id}';
 
         async function injectCrisis(team) {{
             const selector = document.getElementById(team + '-crisis');
@@ -831,7 +1463,7 @@ Neutral: {base_url}/team/neutral
                 return;
             }}
 
-            const response = await fetch(`/inject_crisis?team=${{team}}&crisis_id=${{crisisId}}&token=${{adminToken}}`, {{
+            const response = await fetch(`/inject_crisis?team=${{team}}&crisis_id=${{crisisId}}&token=${{adminToken}}&session=${{sessionId}}`, {{
                 method: 'POST'
             }});
 
@@ -845,7 +1477,7 @@ Neutral: {base_url}/team/neutral
         }}
 
         async function clearCrisis(team) {{
-            const response = await fetch(`/clear_crisis?team=${{team}}&token=${{adminToken}}`, {{
+            const response = await fetch(`/clear_crisis?team=${{team}}&token=${{adminToken}}&session=${{sessionId}}`, {{
                 method: 'POST'
             }});
 
@@ -864,20 +1496,21 @@ Neutral: {base_url}/team/neutral
                 return;
             }}
 
-            const teams = ['usa', 'china', 'neutral'];
-            for (const team of teams) {{
-                await fetch(`/inject_crisis?team=${{team}}&crisis_id=${{crisisId}}&token=${{adminToken}}`, {{
-                    method: 'POST'
-                }});
-            }}
+            const response = await fetch(`/broadcast_crisis?crisis_id=${{crisisId}}&token=${{adminToken}}&session=${{sessionId}}`, {{
+                method: 'POST'
+            }});
 
-            alert('Crisis broadcast to all teams!');
-            location.reload();
+            const data = await response.json();
+            if (data.status === 'injected') {{
+                selector.value = '';
+            }} else {{
+                alert('Failed to broadcast crisis: ' + (data.error || 'Unknown error'));
+            }}
         }}
 
         async function updateTimer() {{
             const duration = document.getElementById('timer-duration').value;
-            const response = await fetch(`/update_timer?duration=${{duration}}&token=${{adminToken}}`, {{
+            const response = await fetch(`/update_timer?duration=${{duration}}&token=${{adminToken}}&session=${{sessionId}}`, {{
                 method: 'POST'
             }});
 
@@ -889,7 +1522,7 @@ Neutral: {base_url}/team/neutral
         }}
 
         async function advanceTimeline() {{
-            const response = await fetch(`/advance_timeline?token=${{adminToken}}`, {{
+            const response = await fetch(`/advance_timeline?token=${{adminToken}}&session=${{sessionId}}`, {{
                 method: 'POST'
             }});
 
@@ -914,6 +1547,38 @@ Neutral: {base_url}/team/neutral
             }}
         }}
 
+        // Live crisis panel: every injection, clear or trigger arrives over the admin room
+        function connectAdminSocket() {{
+            const scheme = location.protocol === 'https:' ? 'wss' : 'ws';
+            const socket = new WebSocket(`${{scheme}}://${{location.host}}/ws/admin?token=${{adminToken}}&session=${{sessionId}}`);
+            socket.onmessage = (e) => {{
+                const message = JSON.parse(e.data);
+                if (message.event !== 'crisis') return;
+
+                const data = message.data;
+                const teams = data.team === 'all' ? ['usa', 'china', 'neutral'] : [data.team];
+                for (const team of teams) {{
+                    document.getElementById(team + '-active-crisis').textContent =
+                        data.crisis ? 'Current: ' + data.crisis.title : 'No active crisis';
+                }}
+            }};
+            socket.onclose = () => setTimeout(connectAdminSocket, 3000);
+        }}
+        connectAdminSocket();
+
+        async function createSession() {{
+            const response = await fetch(`/admin/sessions?token=${{adminToken}}`, {{
+                method: 'POST'
+            }});
+
+            const data = await response.json();
+            if (data.status === 'created') {{
+                location.href = `/admin?token=${{adminToken}}&session=${{data.session}}`;
+            }} else {{
+                alert('Failed to create session: ' + (data.error || 'Unknown error'));
+            }}
+        }}
+
         function copyUrls() {{
             const text = document.getElementById('embed-urls').innerText;
             navigator.clipboard.writeText(text);
@@ -929,60 +1594,128 @@ Neutral: {base_url}/team/neutral
 def generate_crisis_options():
     """Generate HTML options for crisis selector"""
     options = []
-    for crisis in crisis_bank:
+    for crisis in scenarios.crises.values():
         # Group by theme
-        if crisis["id"].startswith("cyber"):
+        if crisis.id.startswith("cyber"):
             emoji = "💻"
-        elif crisis["id"].startswith("ai"):
+        elif crisis.id.startswith("ai"):
             emoji = "🤖"
-        elif "nuclear" in crisis["id"]:
+        elif "nuclear" in crisis.id:
             emoji = "☢️"
-        elif "climate" in crisis["id"] or "ocean" in crisis["id"]:
+        elif "climate" in crisis.id or "ocean" in crisis.id:
             emoji = "🌍"
-        elif "medical" in crisis["id"] or "vaccine" in crisis["id"]:
+        elif "medical" in crisis.id or "vaccine" in crisis.id:
             emoji = "🏥"
         else:
             emoji = "⚡"
 
-        options.append(f'<option value="{crisis["id"]}">{emoji} {crisis["title"]}</option>')
+        options.append(f'<option value="{crisis.id}">{emoji} {crisis.title}</option>')
 
     return '\n'.join(options)
 
 @app.post("/update_timer")
-async def update_timer(duration: int, token: str = None):
-    """Update the global countdown duration"""
+async def update_timer(duration: int, token: str = None, session: str = DEFAULT_SESSION):
+    """Update the session's countdown duration"""
     if token != ADMIN_TOKEN:
         return {"error": "Unauthorized"}
 
-    global countdown_duration
-    countdown_duration = max(10, min(600, duration))
-    return {"status": "updated", "new_duration": countdown_duration}
+    game = await load_session(session)
+    if not game:
+        return {"error": "Unknown session"}
+
+    new_duration = max(10, min(600, duration))
+    await state.set(game.key("countdown"), str(new_duration))
+    render_cache.invalidate()
+    game.broker.publish_all("timer", await timer_state(game))
+    return {"status": "updated", "new_duration": new_duration}
 
 # Health check for each endpoint
 @app.get("/health/{team}")
 async def check_health(team: str):
-    if team not in TEAM_ENDPOINTS:
+    """Last background probe result for a team and each of its backends"""
+    if team not in TEAM_POOLS:
         return {"error": "Invalid team"}
 
-    async with httpx.AsyncClient(timeout=5.0) as client:
-        try:
-            response = await client.get(TEAM_ENDPOINTS[team])
-            return {"team": team, "status": "online", "code": response.status_code}
-        except:
-            return {"team": team, "status": "offline"}
+    return health.report(team)
+
+@app.get("/health")
+async def check_all_health():
+    """Probe every team backend now, concurrently"""
+    return {result["team"]: result for result in await health.probe_all()}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus text format: HTTP metrics plus game, upstream and discovery gauges"""
+    lines = request_metrics.render() + await game_metrics() + upstream_metrics()
+    return Response("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4; charset=utf-8")
+
+async def game_metrics() -> List[str]:
+    """Gauges read from each live session at scrape time"""
+    crises, months, news, events, subscribers = [], [], [], [], []
+    for game in list(sessions.sessions.values()):
+        active = await state.mget([game.key("crisis", team) for team in game.teams])
+        lengths = [await state.llen(game.key("events", team)) for team in game.teams]
+        for team, crisis_id, length in zip(game.teams, active, lengths):
+            crises.append(({"session": game.id, "team": team}, 1 if crisis_id else 0))
+            events.append(({"session": game.id, "team": team}, length))
+
+        index = game.timeline.index_at()
+        month_idx = game.timeline.month_index(index)
+        months.append(({"session": game.id, "month": game.timeline.months[month_idx]}, month_idx))
+        news.append(({"session": game.id}, index))
+        subscribers += [({"session": game.id, "room": room}, len(queues)) for room, queues in game.broker.rooms.items()]
+
+    return (
+        family("game_sessions", "gauge", "Live classroom sessions in this worker", [({}, len(sessions.sessions))])
+        + family("game_crisis_active", "gauge", "1 while a team has an active crisis", crises)
+        + family("game_timeline_month_index", "gauge", "Current timeline month, 0-based, labelled with its name", months)
+        + family("game_timeline_news_index", "gauge", "Index of the news item on screen", news)
+        + family("game_event_log_entries", "gauge", "Logged events per team", events)
+        + family("game_stream_subscribers", "gauge", "SSE and WebSocket connections per room in this worker", subscribers)
+    )
+
+def upstream_metrics() -> List[str]:
+    """Team backends as last probed, plus Vast.ai discovery and gateway cache counters"""
+    backends = [({"team": team, "url": b.url}, b) for team, pool in TEAM_POOLS.items() for b in pool.backends]
+    lines = (
+        family("upstream_up", "gauge", "1 if the last health probe succeeded",
+               [(labels, 1 if b.healthy else 0) for labels, b in backends if b.healthy is not None])
+        + family("upstream_probe_latency_seconds", "gauge", "Latency of the last successful health probe",
+                 [(labels, b.latency) for labels, b in backends if b.latency is not None])
+        + family("upstream_outstanding_requests", "gauge", "Requests in flight to each backend",
+                 [(labels, b.outstanding) for labels, b in backends])
+        + family("upstream_circuit_state", "gauge", "1 for the circuit breaker's current state",
+                 [({**labels, "state": b.breaker.state}, 1) for labels, b in backends])
+        + family("vast_discovery_refreshes_total", "counter", "Vast.ai instance lookups", [({}, discovery.refreshes)])
+        + family("vast_discovery_failures_total", "counter", "Vast.ai instance lookups that found nothing", [({}, discovery.failures)])
+    )
+    if discovery.last_duration is not None:
+        lines += family("vast_discovery_duration_seconds", "gauge", "Duration of the last Vast.ai lookup, probes included",
+                        [({}, discovery.last_duration)])
+    return lines + (
+        family("gateway_cache_hits_total", "counter", "Completions answered from the gateway cache", [({}, gateway.cache.hits)])
+        + family("gateway_cache_misses_total", "counter", "Completions not in the gateway cache", [({}, gateway.cache.misses)])
+        + family("gateway_coalesced_total", "counter", "Completions that joined an identical in-flight request", [({}, gateway.coalesced)])
+    )
 
 @app.get("/dashboard/{team}")
-async def team_dashboard(team: str):
+async def team_dashboard(request: Request, team: str, session: str = DEFAULT_SESSION):
     if team not in ["usa", "china", "neutral"]:
         return HTMLResponse("Invalid team", status_code=404)
+    if not await load_session(session):
+        return HTMLResponse("Unknown session", status_code=404)
+
+    # The page reads ?session= itself, so one copy per team serves every session
+    return render_cache.respond(request, ("dashboard", team), render_team_dashboard, team)
 
+def render_team_dashboard(team: str):
     team_colors = {
         "usa": "#3b82f6",
         "china": "#ef4444",
         "neutral": "#f59e0b"
     }
 
-    return HTMLResponse(f"""
+    return f"""
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -1237,6 +1970,17 @@ async def team_dashboard(team: str):
             font-weight: bold;
         }}
 
+        .ai-advice {{
+            background: rgba(59,130,246,0.15);
+            border: 1px solid #3b82f6;
+            border-radius: 5px;
+            padding: 10px 15px;
+            margin-top: 10px;
+            max-height: 30vh;
+            overflow-y: auto;
+            white-space: pre-wrap;
+        }}
+
         /* Right Panel - Global Status */
         .info-panel {{
             background: rgba(26,26,26,0.9);
@@ -1418,6 +2162,10 @@ async def team_dashboard(team: str):
                                 <div class="crisis-prompt" id="decision-prompt">
                                     🎯 AWAITING INSTRUCTOR SIGNAL TO BEGIN
                                 </div>
+                                <div class="ai-advice" id="ai-advice" style="display: none;">
+                                    <h4 style="color: #3b82f6; margin-bottom: 5px;">🤖 YOUR AI ADVISES...</h4>
+                                    <div id="ai-advice-text"></div>
+                                </div>
                             </div>
                         </div>
 
@@ -1488,16 +2236,35 @@ async def team_dashboard(team: str):
         }}
 
         const currentTeam = '{team}';
+        const sessionId = new URLSearchParams(location.search).get('session') || 'default';
         let timeRemaining = 120;
         let countdownInterval;
         let currentNews = [];
         let lastCrisisTitle = '';
+        let lastNewsId = null;
 
         // Crisis checking
+        let crisisEtag = null;
+        let crisisVersion = null;
+
         async function checkForCrisis() {{
-            const response = await fetch(`/current_crisis/${{currentTeam}}`);
+            // Send the last ETag ourselves; 'no-store' keeps the browser cache from answering for us
+            const headers = crisisEtag ? {{ 'If-None-Match': crisisEtag }} : {{}};
+            // With a version cursor the server holds the request until something changes
+            const since = crisisVersion === null ? '' : `&since=${{crisisVersion}}`;
+            const response = await fetch(`/current_crisis/${{currentTeam}}?session=${{sessionId}}${{since}}`, {{
+                headers,
+                cache: 'no-store'
+            }});
+            if (response.status === 304) return;
+            crisisEtag = response.headers.get('ETag');
             const data = await response.json();
+            if (data.version === undefined) throw new Error(data.error);
+            crisisVersion = data.version;
+            applyCrisis(data);
+        }}
 
+        function applyCrisis(data) {{
             if (data.crisis) {{
                 // Update crisis display
                 document.getElementById('crisis-title').textContent = data.crisis.title;
@@ -1518,15 +2285,51 @@ async def team_dashboard(team: str):
                     const needle = document.getElementById('severity-needle');
                     needle.style.left = '75%';
                 }}
+
+                if (adviceCrisisId !== data.crisis.id) {{
+                    adviceCrisisId = data.crisis.id;
+                    loadAdvice(data.crisis.id);
+                }}
+            }}
+        }}
+
+        // Model answer generated server-side when the crisis activated
+        let adviceCrisisId = null;
+
+        async function loadAdvice(crisisId) {{
+            const panel = document.getElementById('ai-advice');
+            const text = document.getElementById('ai-advice-text');
+            panel.style.display = 'block';
+            text.textContent = 'Consulting your AI system...';
+
+            for (let attempt = 0; attempt < 60 && adviceCrisisId === crisisId; attempt++) {{
+                try {{
+                    const response = await fetch(`/advice/${{currentTeam}}?session=${{sessionId}}`);
+                    const data = await response.json();
+                    if (data.crisis_id !== crisisId) return;
+                    if (data.status === 'ready') {{
+                        text.textContent = data.text;
+                        return;
+                    }}
+                    if (data.status === 'error') {{
+                        text.textContent = 'Your AI system is unavailable right now.';
+                        return;
+                    }}
+                }} catch (e) {{}}
+                await new Promise(resolve => setTimeout(resolve, 3000));
             }}
         }}
 
         // News feed
         async function fetchNews() {{
-            const response = await fetch('/news_feed');
-            const data = await response.json();
+            const response = await fetch(`/news_feed?session=${{sessionId}}`);
+            applyNews(await response.json());
+        }}
 
-            if (data.news) {{
+        function applyNews(data) {{
+            // Polls return the same item until the timeline moves on
+            if (data.news && data.id !== lastNewsId) {{
+                lastNewsId = data.id;
                 currentNews.push(data.news);
                 if (currentNews.length > 5) currentNews.shift();
 
@@ -1535,6 +2338,52 @@ async def team_dashboard(team: str):
             }}
         }}
 
+        // Live updates: server pushes changes, polling only while the stream is down
+        let pollTimers = [];
+        let pollRun = 0;
+
+        function startPolling() {{
+            if (pollTimers.length) return;
+            pollTimers = [setInterval(fetchNews, 20000)];
+            longPollCrisis(++pollRun);
+        }}
+
+        function stopPolling() {{
+            pollTimers.forEach(clearInterval);
+            pollTimers = [];
+            pollRun++;
+        }}
+
+        async function longPollCrisis(run) {{
+            // One request per change instead of one every few seconds
+            crisisVersion = null;
+            while (run === pollRun) {{
+                try {{
+                    await checkForCrisis();
+                }} catch (e) {{
+                    await new Promise(resolve => setTimeout(resolve, 5000));
+                }}
+            }}
+        }}
+
+        function connectStream() {{
+            if (!window.EventSource) {{
+                fetchNews();
+                startPolling();
+                return;
+            }}
+
+            const source = new EventSource(`/stream/${{currentTeam}}?session=${{sessionId}}`);
+            source.onopen = stopPolling;
+            // EventSource reconnects by itself; poll until it does
+            source.onerror = startPolling;
+            source.addEventListener('crisis', e => applyCrisis(JSON.parse(e.data)));
+            source.addEventListener('news', e => applyNews(JSON.parse(e.data)));
+            source.addEventListener('timer', e => {{
+                timeRemaining = JSON.parse(e.data).time_remaining;
+            }});
+        }}
+
         function updateNewsTicker() {{
             const ticker = document.getElementById('news-content');
             ticker.innerHTML = currentNews.map(news =>
@@ -1579,51 +2428,248 @@ async def team_dashboard(team: str):
         }}
 
         // Initialize
-        checkForCrisis();
-        fetchNews();
+        connectStream();
         startCountdown();
 
-        // Polling intervals
-        setInterval(checkForCrisis, 5000);
-        setInterval(fetchNews, 20000);
         setInterval(updateStats, 30000);
     </script>
 </body>
 </html>
-    """)
+    """
 
-@app.get("/current_crisis/{team}")
-async def get_current_crisis(team: str):
-    """Return active crisis for team with timing"""
-    current_time = time.time()
-    time_since_last_crisis = current_time - last_crisis_time
-    time_until_next = countdown_duration - time_since_last_crisis
+async def session_clock(session: Session):
+    """(last crisis time, countdown duration) for a session"""
+    last_crisis_time, countdown = await state.mget([session.key("last_crisis_time"), session.key("countdown")])
+    return float(last_crisis_time or 0), int(countdown or countdown_duration)
+
+def time_remaining(last_crisis_time: float, countdown: int):
+    """Seconds left on a crisis countdown"""
+    time_since_last_crisis = time.time() - last_crisis_time
+    return max(0, int(countdown - time_since_last_crisis))
+
+async def timer_state(session: Session):
+    last_crisis_time, countdown = await session_clock(session)
+    return {
+        "time_remaining": time_remaining(last_crisis_time, countdown),
+        "countdown_duration": countdown
+    }
+
+async def read_crisis(session: Session, team: str):
+    """(crisis id, version, last crisis time, countdown) in one backend read"""
+    return await state.mget([
+        session.key("crisis", team), session.key("version", team),
+        session.key("last_crisis_time"), session.key("countdown")
+    ])
+
+def crisis_etag(session: Session, version: Optional[str], countdown: Optional[str]):
+    """Validator for a team's crisis state; the version moves on every crisis change, the countdown on timer edits"""
+    return f'"{session.id}-{version or 0}-{countdown or countdown_duration}"'
 
+def build_crisis_state(crisis_id: Optional[str], version: Optional[str], last_crisis_time: Optional[str], countdown: Optional[str]):
+    crisis = scenarios.get(crisis_id) if crisis_id else None
+    countdown = int(countdown or countdown_duration)
     return {
-        "crisis": active_crises.get(team),
-        "time_remaining": max(0, int(time_until_next)),
-        "countdown_duration": countdown_duration
+        "crisis": crisis._asdict() if crisis else None,
+        "version": int(version or 0),
+        "time_remaining": time_remaining(float(last_crisis_time or 0), countdown),
+        "countdown_duration": countdown
     }
 
+async def crisis_state(session: Session, team: str):
+    return build_crisis_state(*await read_crisis(session, team))
+
+async def set_crisis(session: Session, team: str, crisis, notify: bool = True):
+    """Store a team's crisis (None clears it) and bump its version"""
+    await state.set(session.key("crisis", team), crisis.id if crisis else "")
+    session.versions[team] = await state.incr(session.key("version", team))
+    if crisis:
+        advice.schedule(team, TEAM_MODEL_NAMES[team], crisis)
+    if notify:
+        await notify_crisis(session, team)
+
+async def notify_crisis(session: Session, team: str):
+    """Push a team's crisis state to its room and the admin console"""
+    session.broker.publish_many([team, ADMIN_ROOM], "crisis", {"team": team, **await crisis_state(session, team)})
+
+async def wait_for_change(session: Session, team: str, timeout: float):
+    """Block until the team's room sees a crisis or timer change, or the timeout passes"""
+    broker = session.broker
+    queue = broker.subscribe(team)
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return
+            # None: the session was closed
+            if message is None or message.event in ("crisis", "timer"):
+                return
+    finally:
+        broker.unsubscribe(team, queue)
+
+@app.get("/current_crisis/{team}")
+async def get_current_crisis(request: Request, team: str, session: str = DEFAULT_SESSION, since: int = None, timeout: float = 25):
+    """Return active crisis for team with timing; 304 when the poller's ETag is still current.
+
+    With ?since=<version> this is a long poll: the request is held until the
+    team's crisis version passes ``since`` (or the timer changes), up to
+    ``timeout`` seconds.
+    """
+    game = await load_session(session)
+    if not game:
+        return {"error": "Unknown session"}
+
+    crisis_id, version, last_crisis_time, countdown = await read_crisis(game, team)
+    if since is not None and team in game.teams and int(version or 0) <= since:
+        # Changes from other workers reach this room through watch_state
+        await wait_for_change(game, team, max(0, min(timeout, LONG_POLL_MAX)))
+        crisis_id, version, last_crisis_time, countdown = await read_crisis(game, team)
+
+    etag = crisis_etag(game, version, countdown)
+    # no-cache: the browser must revalidate, and time_remaining is only fresh on a 200
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    body = json.dumps(build_crisis_state(crisis_id, version, last_crisis_time, countdown))
+    return Response(body, media_type="application/json", headers=headers)
+
+@app.get("/advice/{team}")
+async def get_advice(team: str, session: str = DEFAULT_SESSION):
+    """The team model's pre-generated answer to its current crisis"""
+    game = await load_session(session)
+    if not game or team not in game.teams:
+        return {"error": "Invalid team or session"}
+
+    crisis = scenarios.get(await state.get(game.key("crisis", team)) or "")
+    if not crisis:
+        return {"crisis_id": None, "status": "none"}
+
+    model = TEAM_MODEL_NAMES[team]
+    record = await advice.get(model, crisis.id)
+    if record is None:
+        # Activated before this worker could schedule it; start now
+        advice.schedule(team, model, crisis)
+        record = {"status": "pending"}
+    return {"crisis_id": crisis.id, "model": model, **record}
+
+@app.get("/stream/{team}")
+async def stream_team(team: str, session: str = DEFAULT_SESSION):
+    """Server-Sent Events feed of crisis, news and timer changes for one team"""
+    game = await load_session(session)
+    if not game or team not in game.teams:
+        return HTMLResponse("Invalid team or session", status_code=404)
+
+    broker = game.broker
+    queue = broker.subscribe(team)
+
+    async def event_stream():
+        try:
+            # Send current state first so a (re)connecting dashboard never waits for a change
+            yield format_sse("crisis", await crisis_state(game, team))
+            yield format_sse("news", game.timeline.current())
+
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=15)
+                    if message is None:
+                        # Session closed
+                        return
+                    yield message.sse
+                except asyncio.TimeoutError:
+                    # Comment frame keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+        finally:
+            broker.unsubscribe(team, queue)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@app.websocket("/ws/{room}")
+async def websocket_room(websocket: WebSocket, room: str, token: str = None, session: str = DEFAULT_SESSION):
+    """WebSocket feed for a team room, or the admin room with a valid token"""
+    game = await load_session(session)
+    if not game or room not in game.broker.rooms or (room == ADMIN_ROOM and token != ADMIN_TOKEN):
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    broker = game.broker
+    queue = broker.subscribe(room)
+    sender = asyncio.create_task(drain_to_websocket(queue, websocket))
+    try:
+        teams = game.teams if room == ADMIN_ROOM else [room]
+        for team in teams:
+            await websocket.send_json({"event": "crisis", "data": {"team": team, **await crisis_state(game, team)}})
+        await websocket.send_json({"event": "news", "data": game.timeline.current()})
+
+        # Inbound messages are ignored; receiving only detects the disconnect
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        broker.unsubscribe(room, queue)
+
 @app.post("/inject_crisis")
-async def inject_crisis(team: str, crisis_id: str, token: str = None):
+async def inject_crisis(team: str, crisis_id: str, token: str = None, session: str = DEFAULT_SESSION):
     """Manually inject a crisis"""
     if token != ADMIN_TOKEN:
         return {"error": "Unauthorized"}
 
-    crisis = next((c for c in crisis_bank if c["id"] == crisis_id), None)
-    if crisis and team in active_crises:
-        active_crises[team] = crisis
-        return {"status": "injected", "crisis": crisis["title"]}
-    return {"error": "Invalid crisis or team"}
+    game = await load_session(session)
+    crisis = scenarios.get(crisis_id)
+    if game and crisis and team in game.teams:
+        await set_crisis(game, team, crisis)
+        return {"status": "injected", "crisis": crisis.title}
+    return {"error": "Invalid crisis, team or session"}
+
+@app.post("/broadcast_crisis")
+async def broadcast_crisis(crisis_id: str, token: str = None, session: str = DEFAULT_SESSION):
+    """Inject one crisis into every team with a single state change"""
+    if token != ADMIN_TOKEN:
+        return {"error": "Unauthorized"}
+
+    game = await load_session(session)
+    crisis = scenarios.get(crisis_id)
+    if not game or not crisis:
+        return {"error": "Invalid crisis or session"}
+
+    for team in game.teams:
+        await set_crisis(game, team, crisis, notify=False)
+    # One message for every room: crisis and timer are the same for all teams now, but each
+    # team has its own version, so none goes out (clients take versions from /current_crisis)
+    shared = await crisis_state(game, game.teams[0])
+    del shared["version"]
+    game.broker.publish_all("crisis", {"team": "all", **shared})
+    return {"status": "injected", "crisis": crisis.title}
 
 @app.post("/clear_crisis")
-async def clear_crisis(team: str, token: str = None):
+async def clear_crisis(team: str, token: str = None, session: str = DEFAULT_SESSION):
     """Clear active crisis"""
     if token != ADMIN_TOKEN:
         return {"error": "Unauthorized"}
 
-    if team in active_crises:
-        active_crises[team] = None
+    game = await load_session(session)
+    if game and team in game.teams:
+        await set_crisis(game, team, None)
         return {"status": "cleared"}
-    return {"error": "Invalid team"}
+    return {"error": "Invalid team or session"}
+
+async def team_proxy_root(request: Request):
+    """Open WebUI requests made from the site root, sent to the team whose instance the browser opened last"""
+    team = request.cookies.get(PROXY_TEAM_COOKIE)
+    if team not in TEAM_POOLS or not TEAM_POOLS[team].backends:
+        return HTMLResponse("Not found", status_code=404)
+    return await team_proxy.forward(request, TEAM_POOLS[team], request.url.path.lstrip("/"), "")
+
+# Registered last, so the game's own routes (/api/refresh-instances, /ws/{room}) match first
+for openwebui_path in OPENWEBUI_ROOT_PATHS:
+    app.add_api_route(openwebui_path, team_proxy_root, methods=PROXY_METHODS, include_in_schema=False)
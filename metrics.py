@@ -0,0 +1,144 @@
+# metrics.py
+import asyncio
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Seconds; the top buckets are for long polls (held up to 55 s) and SSE streams
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+UNMATCHED = "<unmatched>"
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: Dict[str, object]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in labels.items()) + "}"
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def family(name: str, kind: str, help_text: str, samples: Iterable[Tuple[Dict[str, object], float]]) -> List[str]:
+    """One metric in Prometheus text format: HELP, TYPE and a line per labelled sample"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{format_labels(labels)} {format_value(value)}" for labels, value in samples)
+    return lines
+
+
+class Histogram:
+    """Fixed buckets allocated up front; observe() is a bisect and two additions"""
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = bounds
+        # One slot per bound plus +Inf, stored per bucket and made cumulative when rendered
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def samples(self, name: str, labels: Dict[str, object]) -> List[str]:
+        lines = []
+        total = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            lines.append(f"{name}_bucket{format_labels({**labels, 'le': format_value(bound)})} {total}")
+        lines.append(f"{name}_sum{format_labels(labels)} {format_value(self.sum)}")
+        lines.append(f"{name}_count{format_labels(labels)} {total}")
+        return lines
+
+
+class RequestMetrics:
+    """Per-route request counts, latency histograms and in-flight requests.
+
+    Everything runs on the event loop, so plain ints and dicts need no locks.
+    Routes are labelled with their template (``/dashboard/{team}``), which
+    Starlette's router stores in the scope once it has matched the request.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        # Scopes of requests still being served, read for the in-flight gauge at scrape time
+        self.active: Dict[int, dict] = {}
+
+    @staticmethod
+    def route(scope: dict) -> str:
+        route = scope.get("route")
+        return getattr(route, "path", UNMATCHED) if route is not None else UNMATCHED
+
+    def record(self, method: str, route: str, status: int, seconds: float):
+        key = (method, route, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        histogram = self.latency.get((method, route))
+        if histogram is None:
+            histogram = self.latency[(method, route)] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+    def render(self) -> List[str]:
+        lines = family(
+            "http_requests_total", "counter", "HTTP requests by method, route template and status",
+            [({"method": method, "route": route, "status": status}, count)
+             for (method, route, status), count in sorted(self.requests.items())]
+        )
+
+        lines += ["# HELP http_request_duration_seconds Time from request to last response byte",
+                  "# TYPE http_request_duration_seconds histogram"]
+        for (method, route), histogram in sorted(self.latency.items()):
+            lines += histogram.samples("http_request_duration_seconds", {"method": method, "route": route})
+
+        in_flight: Dict[Tuple[str, str], int] = {}
+        for scope in list(self.active.values()):
+            key = (scope["method"], self.route(scope))
+            in_flight[key] = in_flight.get(key, 0) + 1
+        lines += family(
+            "http_requests_in_flight", "gauge", "HTTP requests being served, by method and route template",
+            [({"method": method, "route": route}, count) for (method, route), count in sorted(in_flight.items())]
+        )
+        return lines
+
+
+class MetricsMiddleware:
+    """ASGI middleware feeding RequestMetrics; websockets and lifespan pass straight through"""
+
+    def __init__(self, app, metrics: RequestMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status: Optional[int] = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        key = id(scope)
+        self.metrics.active[key] = scope
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except asyncio.CancelledError:
+            # Client went away before an answer: nginx's 499, so it isn't counted as a server error
+            status = status or 499
+            raise
+        finally:
+            del self.metrics.active[key]
+            # Errors that escape the app are answered with a 500 by the server
+            self.metrics.record(scope["method"], self.metrics.route(scope), status or 500, time.perf_counter() - started)
@@ -0,0 +1,192 @@
+# profiler.py
+import asyncio
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional, Tuple
+
+from starlette.routing import compile_path
+
+MODES = ("cprofile", "sample")
+
+
+class ProfileRun:
+    """One profiling window: the next ``max_requests`` matching requests or ``seconds`` of them.
+
+    cprofile mode keeps a cProfile profiler enabled while any matching
+    request is in flight; sample mode has a thread record the event loop
+    thread's stack every ``interval`` seconds at those times. Both see
+    whatever the loop runs meanwhile, including other requests interleaved
+    with the profiled ones.
+    """
+
+    def __init__(
+        self,
+        mode: str,
+        max_requests: Optional[int],
+        seconds: Optional[float],
+        route: Optional[str],
+        interval: float,
+        exclude: Optional[str] = None
+    ):
+        self.mode = mode
+        self.max_requests = max_requests
+        self.seconds = seconds
+        self.route = route
+        # Route templates like /dashboard/{team} match the way the router matches them
+        self.route_regex = compile_path(route)[0] if route else None
+        self.interval = interval
+        self.exclude = exclude
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.admitted = 0
+        self.completed = 0
+        self.inflight = 0
+
+        self.profile = cProfile.Profile() if mode == "cprofile" else None
+        self.samples: Counter = Counter()
+        self.sampler: Optional[threading.Thread] = None
+        self.stopped = threading.Event()
+        if mode == "sample":
+            self.thread_id = threading.get_ident()
+            self.sampler = threading.Thread(target=self.sample, name="request-profiler", daemon=True)
+            self.sampler.start()
+
+    def admits(self, path: str) -> bool:
+        if self.exclude and path.startswith(self.exclude):
+            return False
+        if self.route_regex and not self.route_regex.match(path):
+            return False
+        return self.max_requests is None or self.admitted < self.max_requests
+
+    def enter(self):
+        self.admitted += 1
+        self.inflight += 1
+        if self.inflight == 1 and self.profile:
+            self.profile.enable()
+
+    def leave(self):
+        self.inflight -= 1
+        self.completed += 1
+        if self.inflight == 0 and self.profile:
+            self.profile.disable()
+
+    @property
+    def done(self) -> bool:
+        return self.max_requests is not None and self.completed >= self.max_requests
+
+    def finish(self):
+        if self.finished_at is not None:
+            return
+        self.finished_at = time.time()
+        if self.profile:
+            self.profile.disable()
+        self.stopped.set()
+        if self.sampler:
+            self.sampler.join()
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            if not self.inflight:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def describe(self) -> dict:
+        end = self.finished_at or time.time()
+        return {
+            "mode": self.mode,
+            "route": self.route,
+            "max_requests": self.max_requests,
+            "seconds": self.seconds,
+            "status": "finished" if self.finished_at else "running",
+            "requests_profiled": self.completed,
+            "in_flight": self.inflight,
+            "samples": sum(self.samples.values()) if self.mode == "sample" else None,
+            "started_at": self.started_at,
+            "elapsed": round(end - self.started_at, 3)
+        }
+
+    def export(self, fmt: str) -> Tuple[bytes, str, str]:
+        """(body, filename, media type); pstats or text for cprofile, collapsed stacks for sample"""
+        if self.mode == "sample":
+            if fmt != "collapsed":
+                raise ValueError("Sample profiles download as collapsed")
+            lines = [f"{stack} {count}" for stack, count in self.samples.most_common()]
+            return ("\n".join(lines) + "\n").encode(), "profile.collapsed", "text/plain; charset=utf-8"
+
+        if fmt == "pstats":
+            self.profile.create_stats()
+            # The format pstats.Stats and snakeviz read: a marshalled stats dict
+            return marshal.dumps(self.profile.stats), "profile.pstats", "application/octet-stream"
+        if fmt == "text":
+            out = io.StringIO()
+            pstats.Stats(self.profile, stream=out).sort_stats("cumulative").print_stats(60)
+            return out.getvalue().encode(), "profile.txt", "text/plain; charset=utf-8"
+        raise ValueError("cProfile profiles download as pstats or text")
+
+
+class RequestProfiler:
+    """At most one profiling run at a time, started and collected from the admin API"""
+
+    def __init__(self, interval: float = 0.005, exclude: str = None):
+        self.interval = interval
+        # Path prefix never profiled, so polling the run's status doesn't use it up
+        self.exclude = exclude
+        # The middleware only looks at this: None means profiling is off
+        self.run: Optional[ProfileRun] = None
+        self.last: Optional[ProfileRun] = None
+
+    def start(self, mode: str, max_requests: int = None, seconds: float = None, route: str = None) -> ProfileRun:
+        if self.run is not None:
+            raise ValueError("A profiling run is already in progress")
+        if mode not in MODES:
+            raise ValueError(f"Mode must be one of: {', '.join(MODES)}")
+
+        run = ProfileRun(mode, max_requests, seconds, route, self.interval, self.exclude)
+        self.run = self.last = run
+        if seconds is not None:
+            asyncio.get_running_loop().call_later(seconds, self.finish, run)
+        return run
+
+    def finish(self, run: ProfileRun = None):
+        """End the current run (or ``run``, if it is still the current one)"""
+        run = run or self.run
+        if run is None or run is not self.run:
+            return
+        self.run = None
+        run.finish()
+
+
+class ProfilerMiddleware:
+    """Wraps requests in the current ProfileRun; with none running it is a single attribute check"""
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        run = self.profiler.run
+        if run is None or scope["type"] != "http" or not run.admits(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        run.enter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            run.leave()
+            if run.done:
+                self.profiler.finish(run)
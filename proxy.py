@@ -0,0 +1,235 @@
+# proxy.py
+import asyncio
+import time
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional, Union
+
+import httpx
+from fastapi import Request
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
+
+from balancer import Backend, BackendPool
+from tracing import Tracer
+
+# Largest request body buffered so it can be sent to two backends
+HEDGE_MAX_BODY = 1024 * 1024
+# Only these are ever sent twice: reads, and generation calls that change nothing upstream.
+# Anything else (saving a chat, uploading a file) could be applied twice.
+HEDGE_METHODS = {"GET", "HEAD", "OPTIONS"}
+HEDGE_PATHS = ("api/chat/completions", "ollama/api/chat", "ollama/api/generate", "openai/chat/completions")
+
+# Cookie tying a browser to one of its team's instances (see BackendPool)
+AFFINITY_COOKIE = "team_backend"
+
+# Per-connection headers that must not be forwarded in either direction
+HOP_BY_HOP = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "trailers", "transfer-encoding", "upgrade", "host"
+}
+
+
+class UpstreamResponse(StreamingResponse):
+    """Streams an upstream body and always runs ``close`` afterwards.
+
+    A plain generator ``finally`` is not enough: if the browser disconnects
+    before the first chunk, the generator never starts and never cleans up.
+    """
+
+    def __init__(self, content, close: Callable[[], Awaitable[None]], status_code: int):
+        super().__init__(content, status_code=status_code)
+        self.close = close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.close()
+
+
+class UpstreamProxy:
+    """Streaming reverse proxy to the team AI systems over one pooled client.
+
+    Request and response bodies are passed through chunk by chunk, so a long
+    SSE token stream starts reaching the browser with its first token and
+    nothing is buffered whole. The client only reads the next upstream chunk
+    once the previous one has been sent, which gives backpressure for free.
+    Raw bytes are relayed, so content-encoding passes through untouched.
+
+    When a team has more than one backend, a request that has not received
+    response headers after ``hedge_delay`` seconds is sent to a second
+    backend as well; the first to answer wins and the other is cancelled.
+    With ``hedge_delay=None`` the delay is the pool's recent p95 time to
+    first byte (``default_hedge_delay`` until there are enough samples);
+    0 turns hedging off.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        read_timeout: float = 300.0,
+        hedge_delay: Optional[float] = None,
+        default_hedge_delay: float = 2.0,
+        hedge_paths: Iterable[str] = HEDGE_PATHS,
+        tracer: Tracer = None
+    ):
+        self.max_connections = max_connections
+        self.read_timeout = read_timeout
+        self.hedge_delay = hedge_delay
+        self.default_hedge_delay = default_hedge_delay
+        self.hedge_paths = {path.strip("/") for path in hedge_paths}
+        self.tracer = tracer
+        self.client: Optional[httpx.AsyncClient] = None
+
+    def start(self):
+        limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=20)
+        self.client = httpx.AsyncClient(
+            # Token streams can pause for a long time between chunks
+            timeout=httpx.Timeout(10.0, read=self.read_timeout),
+            limits=limits,
+            transport=self.tracer.transport(limits=limits) if self.tracer else None,
+            follow_redirects=False
+        )
+
+    async def stop(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def can_hedge(self, request: Request, pool: BackendPool, path: str) -> bool:
+        if self.hedge_delay == 0 or len(pool.backends) < 2:
+            return False
+        if request.method not in HEDGE_METHODS and path.strip("/") not in self.hedge_paths:
+            return False
+        # The body is sent twice, so it must be small enough to hold in memory
+        if "transfer-encoding" in request.headers:
+            return False
+        return int(request.headers.get("content-length", 0)) <= HEDGE_MAX_BODY
+
+    async def attempt(self, pool: BackendPool, backend: Backend, request: Request, path: str, prefix: str, content):
+        """Send to one backend, feeding its circuit breaker; releases the backend unless a response comes back"""
+        started = time.perf_counter()
+        try:
+            upstream = await self.send(request, backend.url, path, prefix, content)
+        except httpx.HTTPError:
+            backend.breaker.failure()
+            pool.release(backend)
+            raise
+        except BaseException:
+            # Cancelled as the slower half of a hedge: no verdict on the backend
+            backend.breaker.abandon()
+            pool.release(backend)
+            raise
+
+        if upstream.status_code >= 500:
+            backend.breaker.failure()
+        else:
+            backend.breaker.success()
+            pool.ttfb.append(time.perf_counter() - started)
+        return upstream
+
+    async def forward(self, request: Request, pool: BackendPool, path: str, prefix: str) -> Response:
+        """Send request to the client's backend, or else the least busy one, and stream the answer back; prefix is where the proxy is mounted"""
+        affinity = request.cookies.get(AFFINITY_COOKIE)
+        backend = pool.acquire(affinity=affinity)
+        if backend is None:
+            return HTMLResponse("No AI system available for this team", status_code=503)
+
+        hedge = backend.key != affinity and self.can_hedge(request, pool, path)
+        if hedge:
+            body = await request.body()
+            content = body or None
+        else:
+            # Only stream a body when the browser sent one; a chunked GET confuses some servers
+            has_body = "content-length" in request.headers or "transfer-encoding" in request.headers
+            content = request.stream() if has_body else None
+
+        attempts = {asyncio.ensure_future(self.attempt(pool, backend, request, path, prefix, content)): backend}
+        delay = self.hedge_delay or pool.p95() or self.default_hedge_delay
+        upstream, error = None, None
+        try:
+            pending = set(attempts)
+            while pending and upstream is None:
+                done, pending = await asyncio.wait(
+                    pending, timeout=delay if hedge else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if upstream is None:
+                            upstream, backend = task.result(), attempts[task]
+                        else:
+                            # Both answered at once; drop the spare
+                            await task.result().aclose()
+                            pool.release(attempts[task])
+                    else:
+                        error = task.exception()
+
+                # Slow or failed: try another backend, once
+                if upstream is None and hedge:
+                    hedge = False
+                    spare = pool.acquire(exclude=backend)
+                    if spare:
+                        task = asyncio.ensure_future(self.attempt(pool, spare, request, path, prefix, content))
+                        attempts[task] = spare
+                        pending.add(task)
+        finally:
+            # Cancel the loser; the request itself may have been cancelled too
+            losers = [task for task in attempts if not task.done()]
+            for task in losers:
+                task.cancel()
+            for task, result in zip(losers, await asyncio.gather(*losers, return_exceptions=True)):
+                if isinstance(result, httpx.Response):
+                    await result.aclose()
+                    pool.release(attempts[task])
+
+        if upstream is None:
+            if isinstance(error, httpx.HTTPError):
+                return HTMLResponse(f"Team AI system unreachable: {type(error).__name__}", status_code=502)
+            raise error
+
+        # The request counts as outstanding until its response body is finished
+        async def close():
+            await upstream.aclose()
+            pool.release(backend)
+
+        response = UpstreamResponse(upstream.aiter_raw(), close, upstream.status_code)
+        response.raw_headers = [
+            (k.encode("latin-1"), self.rewrite_header(k, v, backend.url, prefix).encode("latin-1"))
+            for k, v in upstream.headers.multi_items() if k.lower() not in HOP_BY_HOP
+        ]
+        if upstream.headers.get("content-type", "").startswith("text/event-stream"):
+            # Stop nginx-style front proxies from buffering the token stream
+            response.raw_headers.append((b"x-accel-buffering", b"no"))
+        if backend.key != affinity:
+            # New client, or its instance was ejected: keep it on this one from now on
+            # Site-wide, since Open WebUI also calls its API from the site root
+            cookie = f"{AFFINITY_COOKIE}={backend.key}; Path=/; HttpOnly; SameSite=Lax"
+            response.raw_headers.append((b"set-cookie", cookie.encode("latin-1")))
+        return response
+
+    async def send(self, request: Request, base_url: str, path: str, prefix: str, content: Optional[Union[bytes, AsyncIterator[bytes]]]) -> httpx.Response:
+        """Open a streamed upstream response for request; the caller must close it"""
+        url = f"{base_url.rstrip('/')}/{path}"
+        if request.url.query:
+            url += f"?{request.url.query}"
+
+        headers = [(k, v) for k, v in request.headers.items() if k.lower() not in HOP_BY_HOP]
+        headers += [
+            ("x-forwarded-for", request.client.host if request.client else ""),
+            ("x-forwarded-proto", request.url.scheme),
+            ("x-forwarded-host", request.headers.get("host", "")),
+            ("x-forwarded-prefix", prefix)
+        ]
+        upstream_request = self.client.build_request(request.method, url, headers=headers, content=content)
+
+        return await self.client.send(upstream_request, stream=True)
+
+    @staticmethod
+    def rewrite_header(name: str, value: str, base_url: str, prefix: str) -> str:
+        """Keep upstream redirects inside the proxy"""
+        if name.lower() != "location":
+            return value
+        base_url = base_url.rstrip("/")
+        if value.startswith(base_url):
+            return prefix + value[len(base_url):]
+        if value.startswith("/"):
+            return prefix + value
+        return value
@@ -0,0 +1,43 @@
+# rendercache.py
+import gzip
+from typing import Callable, Dict, Hashable
+
+from fastapi import Request
+from fastapi.responses import Response
+
+
+class CachedPage:
+    """Finished HTML bytes plus a gzip copy, built once per config version"""
+
+    __slots__ = ("body", "gzipped")
+
+    def __init__(self, html: str):
+        self.body = html.encode("utf-8")
+        self.gzipped = gzip.compress(self.body, compresslevel=6)
+
+
+class RenderCache:
+    """Rendered pages keyed by (page, team); invalidate() when anything they embed changes"""
+
+    def __init__(self):
+        self.version = 0
+        self.pages: Dict[Hashable, CachedPage] = {}
+
+    def invalidate(self):
+        self.version += 1
+        self.pages.clear()
+
+    def get(self, key: Hashable, render: Callable[..., str], *args) -> CachedPage:
+        page = self.pages.get(key)
+        if page is None:
+            page = self.pages[key] = CachedPage(render(*args))
+        return page
+
+    def respond(self, request: Request, key: Hashable, render: Callable[..., str], *args) -> Response:
+        """Serve a cached page, gzipped when the browser accepts it"""
+        page = self.get(key, render, *args)
+        headers = {"Vary": "Accept-Encoding"}
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+            return Response(page.gzipped, media_type="text/html; charset=utf-8", headers=headers)
+        return Response(page.body, media_type="text/html; charset=utf-8", headers=headers)
@@ -0,0 +1,49 @@
+# scenarios.py
+from typing import Dict, List, NamedTuple, Optional
+
+from timeline import NewsItem, Timeline
+
+
+class Crisis(NamedTuple):
+    id: str
+    title: str
+    description: str
+    prompt: str
+
+
+class ScenarioIndex:
+    """Crisis bank and news triggers compiled once at startup for O(1) lookups"""
+
+    def __init__(self, crisis_bank: List[dict], timeline: Timeline):
+        self.crises: Dict[str, Crisis] = {}
+        self.duplicates: List[str] = []
+        for entry in crisis_bank:
+            crisis = Crisis(entry["id"], entry["title"], entry["description"], entry["prompt"])
+            if crisis.id in self.crises:
+                self.duplicates.append(crisis.id)
+            self.crises[crisis.id] = crisis
+
+        # news id -> crisis it activates; dangling ids are kept aside for the report
+        self.triggers: Dict[str, Crisis] = {}
+        self.dangling: Dict[str, List[str]] = {}
+        for item in timeline.items:
+            if not item.trigger:
+                continue
+            crisis = self.crises.get(item.trigger)
+            if crisis:
+                self.triggers[item.id] = crisis
+            else:
+                self.dangling.setdefault(item.trigger, []).append(item.id)
+
+    def get(self, crisis_id: str) -> Optional[Crisis]:
+        return self.crises.get(crisis_id)
+
+    def trigger_for(self, news_item: NewsItem) -> Optional[Crisis]:
+        return self.triggers.get(news_item.id)
+
+    def report(self) -> List[str]:
+        """Human-readable problems found while compiling"""
+        problems = [f"Duplicate crisis id: {crisis_id}" for crisis_id in self.duplicates]
+        for crisis_id, news_ids in sorted(self.dangling.items()):
+            problems.append(f"Trigger '{crisis_id}' not in crisis_bank (news: {', '.join(news_ids)})")
+        return problems
@@ -0,0 +1,83 @@
+# sessions.py
+import asyncio
+import re
+import secrets
+from typing import Dict, Iterable, Optional
+
+from events import ADMIN_ROOM, EventBroker
+from timeline import Timeline
+
+DEFAULT_SESSION = "default"
+SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+
+
+def session_key(session_id: str, *parts: str) -> str:
+    """State backend key scoped to one session"""
+    return ":".join((session_id,) + parts)
+
+
+class Session:
+    """Per-process handle on one classroom section; the game state itself lives in the state backend"""
+
+    __slots__ = ("id", "timeline", "teams", "broker", "timeline_changed", "pump", "watcher", "versions")
+
+    def __init__(self, session_id: str, timeline: Timeline, teams: Iterable[str]):
+        self.id = session_id
+        self.timeline = timeline
+        self.teams = list(teams)
+        # One room per team plus the admin console
+        self.broker = EventBroker(self.teams + [ADMIN_ROOM])
+        self.timeline_changed = asyncio.Event()
+        self.pump: Optional[asyncio.Task] = None
+        self.watcher: Optional[asyncio.Task] = None
+        # Last crisis version per team this process has pushed to its subscribers
+        self.versions: Dict[str, int] = {}
+
+    def key(self, *parts: str) -> str:
+        return session_key(self.id, *parts)
+
+
+class SessionStore:
+    """Live sessions keyed by the id carried in each URL"""
+
+    def __init__(self, template: Timeline, teams: Iterable[str], limit: int = 64):
+        self.template = template
+        self.teams = list(teams)
+        self.limit = limit
+        self.sessions: Dict[str, Session] = {}
+
+    def get(self, session_id: str) -> Optional[Session]:
+        return self.sessions.get(session_id)
+
+    def create(self, session_id: str = None, interval: float = None) -> Session:
+        """Start a session with its own timeline clock; raises ValueError for a bad or taken id"""
+        session_id = session_id or secrets.token_urlsafe(6)
+        if not SESSION_ID.match(session_id):
+            raise ValueError("Session id must be 1-32 letters, digits, '-' or '_'")
+        if session_id in self.sessions:
+            raise ValueError("Session already exists")
+        if len(self.sessions) >= self.limit:
+            raise ValueError("Too many sessions")
+
+        session = Session(session_id, self.template.fork(interval), self.teams)
+        self.sessions[session_id] = session
+        return session
+
+    def close(self, session_id: str) -> bool:
+        session = self.sessions.pop(session_id, None)
+        if not session:
+            return False
+        for task in (session.pump, session.watcher):
+            if task:
+                task.cancel()
+        session.broker.close()
+        return True
+
+    async def stop(self):
+        """Close every session and wait for its clock and state watcher to exit"""
+        tasks = []
+        for session_id in list(self.sessions):
+            session = self.sessions[session_id]
+            tasks += [task for task in (session.pump, session.watcher) if task]
+            self.close(session_id)
+        await asyncio.gather(*tasks, return_exceptions=True)
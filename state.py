@@ -0,0 +1,360 @@
+# state.py
+import asyncio
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+class StateBackend:
+    """Shared game state as string keys, counters and append-only lists.
+
+    The method names follow the Redis commands they map to. Every uvicorn
+    worker talks to the same backend, so state written by one worker is
+    visible to the others.
+    """
+
+    # True when state survives a restart without help from the event log file
+    durable = False
+    # True when other processes may write to the same state
+    shared = False
+
+    async def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def mget(self, keys: List[str]) -> List[Optional[str]]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: str):
+        raise NotImplementedError
+
+    async def setnx(self, key: str, value: str) -> bool:
+        """Set only if missing; True when this call created the key"""
+        raise NotImplementedError
+
+    async def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+    async def rpush(self, key: str, value: str):
+        """Append to a list; nothing is returned, since not every backend knows the new length for free"""
+        raise NotImplementedError
+
+    async def lrange(self, key: str, start: int = 0, stop: int = -1) -> List[str]:
+        """Items start..stop inclusive; stop=-1 reads to the end"""
+        raise NotImplementedError
+
+    async def llen(self, key: str) -> int:
+        raise NotImplementedError
+
+    async def lscan(self, key: str, cursor: int = 0, count: int = 500) -> Tuple[List[str], int]:
+        """Up to count items after cursor (0: the head), and the cursor to pass for the next page.
+
+        Unlike paging with lrange offsets, each page costs the same however
+        far into the list it is, so reading a whole list is linear.
+        """
+        raise NotImplementedError
+
+    async def delete(self, keys: List[str]):
+        """Remove keys, whether they hold a value or a list"""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class MemoryBackend(StateBackend):
+    """In-process dicts: one worker, nothing survives a restart"""
+
+    def __init__(self):
+        self.values: Dict[str, str] = {}
+        self.lists: Dict[str, List[str]] = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    async def set(self, key, value):
+        self.values[key] = value
+
+    async def setnx(self, key, value):
+        if key in self.values:
+            return False
+        self.values[key] = value
+        return True
+
+    async def incr(self, key):
+        value = int(self.values.get(key, 0)) + 1
+        self.values[key] = str(value)
+        return value
+
+    async def rpush(self, key, value):
+        self.lists.setdefault(key, []).append(value)
+
+    async def lrange(self, key, start=0, stop=-1):
+        items = self.lists.get(key, [])
+        return items[start:] if stop == -1 else items[start:stop + 1]
+
+    async def llen(self, key):
+        return len(self.lists.get(key, ()))
+
+    async def lscan(self, key, cursor=0, count=500):
+        items = self.lists.get(key, [])[cursor:cursor + count]
+        return items, cursor + len(items)
+
+    async def delete(self, keys):
+        for key in keys:
+            self.values.pop(key, None)
+            self.lists.pop(key, None)
+
+
+class SQLiteBackend(StateBackend):
+    """One SQLite file in WAL mode, shared by workers on the same host"""
+
+    durable = True
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS lists (id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL, value TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS lists_key ON lists (key, id)")
+
+    async def _run(self, fn, *args):
+        # sqlite3 blocks; keep it off the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, self._locked, fn, *args)
+
+    def _locked(self, fn, *args):
+        with self._lock:
+            return fn(*args)
+
+    def _write(self, *statements):
+        """Run statements in one IMMEDIATE transaction and return the last cursor"""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            for sql, params in statements:
+                cursor = self._db.execute(sql, params)
+            self._db.execute("COMMIT")
+            return cursor
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+
+    def _get(self, key):
+        row = self._db.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _mget(self, keys):
+        placeholders = ",".join("?" * len(keys))
+        rows = dict(self._db.execute(f"SELECT key, value FROM kv WHERE key IN ({placeholders})", keys).fetchall())
+        return [rows.get(key) for key in keys]
+
+    def _incr(self, key):
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            self._db.execute(
+                "INSERT INTO kv VALUES (?, '1') ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+                (key,)
+            )
+            value = int(self._get(key))
+            self._db.execute("COMMIT")
+            return value
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+
+    def _lrange(self, key, start, stop):
+        limit = -1 if stop == -1 else max(0, stop - start + 1)
+        rows = self._db.execute(
+            "SELECT value FROM lists WHERE key = ? ORDER BY id LIMIT ? OFFSET ?", (key, limit, start)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def _lscan(self, key, cursor, count):
+        # Keyset paging on the row id: an index seek, never an OFFSET scan
+        rows = self._db.execute(
+            "SELECT id, value FROM lists WHERE key = ? AND id > ? ORDER BY id LIMIT ?", (key, cursor, count)
+        ).fetchall()
+        return [row[1] for row in rows], rows[-1][0] if rows else cursor
+
+    def _llen(self, key):
+        return self._db.execute("SELECT COUNT(*) FROM lists WHERE key = ?", (key,)).fetchone()[0]
+
+    async def get(self, key):
+        return await self._run(self._get, key)
+
+    async def mget(self, keys):
+        return await self._run(self._mget, list(keys))
+
+    async def set(self, key, value):
+        await self._run(self._write, ("INSERT OR REPLACE INTO kv VALUES (?, ?)", (key, value)))
+
+    async def setnx(self, key, value):
+        cursor = await self._run(self._write, ("INSERT OR IGNORE INTO kv VALUES (?, ?)", (key, value)))
+        return cursor.rowcount == 1
+
+    async def incr(self, key):
+        return await self._run(self._incr, key)
+
+    async def rpush(self, key, value):
+        await self._run(self._write, ("INSERT INTO lists (key, value) VALUES (?, ?)", (key, value)))
+
+    async def lrange(self, key, start=0, stop=-1):
+        return await self._run(self._lrange, key, start, stop)
+
+    async def llen(self, key):
+        return await self._run(self._llen, key)
+
+    async def lscan(self, key, cursor=0, count=500):
+        return await self._run(self._lscan, key, cursor, count)
+
+    async def delete(self, keys):
+        keys = list(keys)
+        placeholders = ",".join("?" * len(keys))
+        await self._run(
+            self._write,
+            (f"DELETE FROM kv WHERE key IN ({placeholders})", keys),
+            (f"DELETE FROM lists WHERE key IN ({placeholders})", keys)
+        )
+
+    async def close(self):
+        self._db.close()
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisBackend(StateBackend):
+    """Minimal RESP2 client over one asyncio connection; any Redis-protocol server works"""
+
+    durable = True
+    shared = True
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0, password: str = None):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self._reader = None
+        self._writer = None
+        self._lock = None
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            await self._call("AUTH", self.password)
+        if self.db:
+            await self._call("SELECT", self.db)
+
+    async def execute(self, *args):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    await self._connect()
+                return await self._call(*args)
+            except RedisError:
+                # An error reply was read in full; the connection is still in step
+                raise
+            except BaseException:
+                # Broken, or cancelled mid-reply (its answer would go to the next command):
+                # drop the connection either way; the next command reconnects
+                if self._writer is not None:
+                    self._writer.close()
+                    self._writer = None
+                raise
+
+    async def _call(self, *args):
+        payload = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            payload.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._writer.write(b"".join(payload))
+        await self._writer.drain()
+        return await self._read_reply()
+
+    async def _read_reply(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode()
+        if kind == b"-":
+            raise RedisError(body.decode())
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length == -1:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2].decode()
+        if kind == b"*":
+            count = int(body)
+            if count == -1:
+                return None
+            return [await self._read_reply() for _ in range(count)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    async def get(self, key):
+        return await self.execute("GET", key)
+
+    async def mget(self, keys):
+        return await self.execute("MGET", *keys)
+
+    async def set(self, key, value):
+        await self.execute("SET", key, value)
+
+    async def setnx(self, key, value):
+        return await self.execute("SETNX", key, value) == 1
+
+    async def incr(self, key):
+        return await self.execute("INCR", key)
+
+    async def rpush(self, key, value):
+        await self.execute("RPUSH", key, value)
+
+    async def lrange(self, key, start=0, stop=-1):
+        return await self.execute("LRANGE", key, start, stop)
+
+    async def llen(self, key):
+        return await self.execute("LLEN", key)
+
+    async def lscan(self, key, cursor=0, count=500):
+        # Redis lists have no keys to seek on, so the cursor is an index. Reaching it skips
+        # whole quicklist nodes (hundreds of entries each), which keeps deep pages cheap.
+        items = await self.execute("LRANGE", key, cursor, cursor + count - 1)
+        return items, cursor + len(items)
+
+    async def delete(self, keys):
+        await self.execute("DEL", *keys)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def backend_from_url(url: str = None) -> StateBackend:
+    """memory:// (default), sqlite:///state.db or redis://[:password@]host:port/db"""
+    if not url or url.startswith("memory"):
+        return MemoryBackend()
+
+    parsed = urlparse(url)
+    if parsed.scheme == "sqlite":
+        # sqlite:///state.db is relative, sqlite:////data/state.db absolute
+        return SQLiteBackend(parsed.path[1:])
+    if parsed.scheme == "redis":
+        db = int(parsed.path.lstrip("/") or 0)
+        return RedisBackend(parsed.hostname or "localhost", parsed.port or 6379, db, parsed.password)
+    raise ValueError(f"Unsupported STATE_BACKEND: {url}")
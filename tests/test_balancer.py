@@ -0,0 +1,81 @@
+from balancer import CLOSED, HALF_OPEN, OPEN, BackendPool, CircuitBreaker
+
+
+def open_breaker(cooldown: float = 60.0) -> CircuitBreaker:
+    breaker = CircuitBreaker(threshold=3, cooldown=cooldown)
+    for _ in range(3):
+        assert breaker.allows()
+        breaker.failure()
+    return breaker
+
+
+def test_opens_after_threshold_failures_in_a_row():
+    breaker = CircuitBreaker(threshold=3)
+    breaker.failure()
+    breaker.failure()
+    breaker.success()
+    breaker.failure()
+    breaker.failure()
+    assert breaker.state == CLOSED and breaker.allows()
+
+    breaker.failure()
+    assert breaker.state == OPEN
+    assert not breaker.allows()
+
+
+def test_half_open_admits_one_trial():
+    breaker = open_breaker(cooldown=0)
+    assert breaker.allows()
+    assert breaker.state == HALF_OPEN
+    breaker.on_pick()
+    assert not breaker.allows()
+
+
+def test_successful_trial_closes():
+    breaker = open_breaker(cooldown=0)
+    breaker.allows()
+    breaker.on_pick()
+    breaker.success()
+    assert breaker.state == CLOSED and breaker.failures == 0
+    assert breaker.allows()
+
+
+def test_failed_trial_reopens_for_another_cooldown():
+    breaker = open_breaker(cooldown=0)
+    breaker.allows()
+    breaker.on_pick()
+    breaker.cooldown = 60.0
+    breaker.failure()
+    assert breaker.state == OPEN
+    assert not breaker.allows()
+
+
+def test_abandoned_trial_lets_another_through():
+    breaker = open_breaker(cooldown=0)
+    breaker.allows()
+    breaker.on_pick()
+    breaker.abandon()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allows()
+
+
+def test_pool_skips_open_circuits():
+    pool = BackendPool(["http://a", "http://b"])
+    a, b = pool.backends
+    a.breaker = open_breaker()
+    assert all(pool.acquire() is b for _ in range(3))
+    assert (a.outstanding, b.outstanding) == (0, 3)
+
+
+def test_affinity_sticks_until_the_instance_is_ejected():
+    pool = BackendPool(["http://a", "http://b"])
+    a, b = pool.backends
+    a.outstanding = 10
+    assert pool.pick(affinity=a.key) is a
+    assert pool.pick(affinity="unknown") is b
+
+    a.healthy = False
+    assert pool.pick(affinity=a.key) is b
+    a.healthy = True
+    a.breaker = open_breaker()
+    assert pool.pick(affinity=a.key) is b
@@ -0,0 +1,46 @@
+import asyncio
+
+from discovery import Candidate, InstanceDiscovery, assign_teams, model_keywords
+
+
+def test_refresh_loop_survives_a_failing_assign():
+    calls = []
+
+    def fetch():
+        return [Candidate("1", "http://a", "usa")]
+
+    async def assign(candidates):
+        calls.append(len(calls))
+        if len(calls) == 1:
+            raise RuntimeError("probe blew up")
+        return {"usa": [c.url for c in candidates]}
+
+    async def run():
+        discovery = InstanceDiscovery(fetch, assign, lambda instances: None, interval=0.01)
+        discovery.start()
+        await asyncio.sleep(0.2)
+        await discovery.stop()
+        return discovery
+
+    discovery = asyncio.run(run())
+    assert len(calls) > 2
+    assert discovery.instances == {"usa": ["http://a"]}
+    assert discovery.failures == 1
+    assert discovery.refreshes == len(calls)
+
+
+def test_model_keywords():
+    assert model_keywords("llama2:70b") == ["llama2", "llama"]
+    assert model_keywords("deepseek-llm:67b") == ["deepseek-llm", "deepseek"]
+    assert model_keywords("yi:34b") == ["yi"]
+    assert model_keywords("Qwen/Qwen2-72B-Instruct") == ["qwen2-72b-instruct", "qwen"]
+
+
+def test_instances_follow_the_configured_model():
+    candidates = [Candidate("1", "http://a", "qwen2-72b"), Candidate("2", "http://b", "deepseek")]
+    team_models = {
+        "usa": ("usa", *model_keywords("qwen2:72b")),
+        "china": ("china", *model_keywords("deepseek-llm:67b"))
+    }
+    pools = assign_teams(candidates, [0.1, 0.2], team_models, 2.0)
+    assert pools == {"usa": ["http://a"], "china": ["http://b"]}
@@ -0,0 +1,31 @@
+import asyncio
+import json
+
+from eventlog import EventLogWriter
+
+
+def test_failed_writes_are_dropped_without_blocking(tmp_path):
+    async def run():
+        writer = EventLogWriter(str(tmp_path / "missing" / "log.jsonl"), flush_interval=0.01, max_pending=5, retry_delay=0.01)
+        writer.start()
+        # Far more than max_pending: submit must keep returning while every write fails
+        for i in range(50):
+            await asyncio.wait_for(writer.submit({"i": i}), 1)
+        await asyncio.wait_for(writer.stop(), 1)
+        assert writer.written == 0
+        assert writer.dropped == 50
+
+    asyncio.run(run())
+
+
+def test_batches_are_appended(tmp_path):
+    async def run():
+        path = tmp_path / "log.jsonl"
+        writer = EventLogWriter(str(path), flush_interval=0.01)
+        writer.start()
+        for i in range(3):
+            await writer.submit({"i": i})
+        await writer.stop()
+        assert [json.loads(line)["i"] for line in path.read_text().splitlines()] == [0, 1, 2]
+
+    asyncio.run(run())
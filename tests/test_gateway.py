@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+import httpx
+
+from balancer import BackendPool
+from gateway import CompletionGateway, payload_error
+
+
+def upstream(accepts_lists: bool, calls: list):
+    """A completions server; like Ollama's /v1/completions when it rejects a list of prompts"""
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        prompt = json.loads(request.content)["prompt"]
+        calls.append(prompt)
+        if isinstance(prompt, list) and not accepts_lists:
+            return httpx.Response(400, json={"error": {"message": "prompt must be a string"}})
+        prompts = prompt if isinstance(prompt, list) else [prompt]
+        return httpx.Response(200, json={"choices": [{"index": i, "text": p.upper()} for i, p in enumerate(prompts)]})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handle))
+
+
+def complete_all(accepts_lists: bool, count: int = 5):
+    calls = []
+
+    async def run():
+        gateway = CompletionGateway("api/chat/completions", completions_path="v1/completions", batch_window=0.05)
+        gateway.start(upstream(accepts_lists, calls))
+        pool = BackendPool(["http://team-ai"])
+        results = await asyncio.gather(*(
+            gateway.complete("usa", pool, {"model": "m", "prompt": f"p{i}"}, kind="completions") for i in range(count)
+        ))
+        await gateway.stop()
+        return gateway, results
+
+    gateway, results = asyncio.run(run())
+    return gateway, results, calls
+
+
+def test_prompts_in_one_window_share_a_call():
+    gateway, results, calls = complete_all(accepts_lists=True)
+    assert calls == [["p0", "p1", "p2", "p3", "p4"]]
+    assert [body["choices"][0]["text"] for _, body, _ in results] == ["P0", "P1", "P2", "P3", "P4"]
+
+
+def test_rejected_batch_falls_back_to_single_calls():
+    gateway, results, calls = complete_all(accepts_lists=False)
+    assert [status for status, _, _ in results] == [200] * 5
+    assert [body["choices"][0]["text"] for _, body, _ in results] == ["P0", "P1", "P2", "P3", "P4"]
+    assert sorted(call for call in calls if isinstance(call, str)) == ["p0", "p1", "p2", "p3", "p4"]
+    assert gateway.batching is False
+
+
+def test_caller_credentials_skip_the_cache():
+    seen = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        seen.append(request.headers.get("authorization"))
+        return httpx.Response(200, json={"choices": [{"index": 0, "message": {"role": "assistant", "content": "hi"}}]})
+
+    async def run():
+        gateway = CompletionGateway("api/chat/completions", api_key="server-key")
+        gateway.start(httpx.AsyncClient(transport=httpx.MockTransport(handle)))
+        pool = BackendPool(["http://team-ai"])
+        payload = {"model": "m", "messages": [{"role": "user", "content": "q"}]}
+        outcomes = [
+            (await gateway.complete("usa", pool, payload))[2],
+            (await gateway.complete("usa", pool, payload, authorization="Bearer student"))[2],
+            (await gateway.complete("usa", pool, payload))[2],
+        ]
+        return outcomes
+
+    assert asyncio.run(run()) == ["miss", "bypass", "hit"]
+    assert seen == ["Bearer server-key", "Bearer student"]
+
+
+def test_payload_shape():
+    assert payload_error("chat", {"model": "m", "messages": [{"role": "user", "content": "q"}]}) is None
+    assert payload_error("completions", {"model": "m", "prompt": ["a", "b"]}) is None
+    for body in ([], "x", {"messages": "hi"}, {"messages": ["hi"]}, {}):
+        assert payload_error("chat", body)
+    for body in ({"prompt": 3}, {"prompt": [1]}, {}):
+        assert payload_error("completions", body)
@@ -0,0 +1,46 @@
+import asyncio
+
+import httpx
+
+from balancer import BackendPool
+from health import HealthProber
+
+
+def test_malformed_url_marks_only_that_backend_down():
+    async def run():
+        pools = {"usa": BackendPool(["http://1.2.3.4:None", "http://ok"])}
+        prober = HealthProber(pools)
+        prober.client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200)))
+        reports = await prober.probe_all()
+        latency = await prober.measure("http://1.2.3.4:None")
+        await prober.client.aclose()
+        return pools["usa"].backends, reports, latency
+
+    (bad, good), reports, latency = asyncio.run(run())
+    assert (bad.healthy, bad.error) == (False, "InvalidURL")
+    assert good.healthy and good.code == 200
+    assert reports[0]["status"] == "online"
+    assert latency is None
+
+
+def test_run_survives_a_failed_round():
+    rounds = []
+
+    async def run():
+        prober = HealthProber({}, interval=0.01)
+
+        async def probe_all():
+            rounds.append(len(rounds))
+            if len(rounds) == 1:
+                raise RuntimeError("boom")
+            return []
+
+        prober.probe_all = probe_all
+        prober.changed = asyncio.Event()
+        task = asyncio.create_task(prober.run())
+        await asyncio.sleep(0.1)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+    assert len(rounds) > 2
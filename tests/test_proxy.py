@@ -0,0 +1,162 @@
+import asyncio
+
+import httpx
+from starlette.requests import Request
+
+from balancer import BackendPool
+from proxy import AFFINITY_COOKIE, UpstreamProxy
+
+
+def inbound(method: str, path: str, body: bytes = b"", cookie: str = None) -> Request:
+    headers = [(b"host", b"game"), (b"content-length", str(len(body)).encode())] if body else [(b"host", b"game")]
+    if cookie:
+        headers.append((b"cookie", cookie.encode()))
+    scope = {
+        "type": "http", "method": method, "path": f"/team/usa/proxy/{path}", "raw_path": f"/team/usa/proxy/{path}".encode(),
+        "query_string": b"", "headers": headers, "scheme": "http", "server": ("game", 80), "client": ("10.0.0.1", 5000)
+    }
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            await asyncio.Event().wait()
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return Request(scope, receive)
+
+
+def proxy_through(handle, method: str = "GET", path: str = "", body: bytes = b"", affinity: int = None):
+    """Forward one request to a two-instance pool served by handle; returns the pool, response and body"""
+
+    async def run():
+        proxy = UpstreamProxy(hedge_delay=0.05)
+        proxy.client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+        pool = BackendPool(["http://a", "http://b"])
+        cookie = f"{AFFINITY_COOKIE}={pool.backends[affinity].key}" if affinity is not None else None
+        request = inbound(method, path, body, cookie)
+        response = await proxy.forward(request, pool, path, "/team/usa/proxy")
+        during = sum(b.outstanding for b in pool.backends)
+
+        chunks = []
+
+        async def send(message):
+            chunks.append(message.get("body", b""))
+
+        await response(request.scope, request.receive, send)
+        await proxy.stop()
+        return pool, during, response, b"".join(chunks)
+
+    return asyncio.run(run())
+
+
+def reply(body: bytes) -> httpx.Response:
+    # Streamed like a real upstream body, so the proxy can relay it
+    return httpx.Response(200, stream=httpx.ByteStream(body))
+
+
+def slow_first(calls: list):
+    async def handle(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.host)
+        if len(calls) == 1:
+            await asyncio.sleep(5)
+        return reply(request.url.host.encode())
+
+    return handle
+
+
+def test_hedge_winner_holds_the_only_slot():
+    calls = []
+    pool, during, response, body = proxy_through(slow_first(calls))
+    assert len(calls) == 2 and calls[0] != calls[1]
+    assert response.status_code == 200 and body.decode() == calls[1]
+    assert during == 1
+    assert [b.outstanding for b in pool.backends] == [0, 0]
+    # The cancelled loser is no verdict on its backend
+    assert all(b.breaker.failures == 0 for b in pool.backends)
+
+
+def test_failover_after_connect_error():
+    calls = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.host)
+        if len(calls) == 1:
+            raise httpx.ConnectError("refused", request=request)
+        return reply(b"ok")
+
+    pool, during, response, body = proxy_through(handle, "POST", "api/chat/completions", b"{}")
+    assert response.status_code == 200 and body == b"ok"
+    assert [b.outstanding for b in pool.backends] == [0, 0]
+    failed = next(b for b in pool.backends if b.url == f"http://{calls[0]}")
+    assert failed.breaker.failures == 1
+
+
+def test_other_posts_are_sent_once():
+    calls = []
+
+    async def handle(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.host)
+        await asyncio.sleep(0.2)
+        return reply(b"saved")
+
+    pool, during, response, body = proxy_through(handle, "POST", "api/v1/chats/new", b"{}")
+    assert len(calls) == 1
+    assert response.status_code == 200 and body == b"saved"
+    assert [b.outstanding for b in pool.backends] == [0, 0]
+
+
+def test_both_unreachable():
+    def handle(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("refused", request=request)
+
+    pool, during, response, body = proxy_through(handle)
+    assert response.status_code == 502
+    assert during == 0
+    assert [b.outstanding for b in pool.backends] == [0, 0]
+    assert all(b.breaker.failures == 1 for b in pool.backends)
+
+
+def test_new_client_is_pinned_to_the_instance_that_answered():
+    calls = []
+    pool, during, response, body = proxy_through(slow_first(calls))
+    cookie = response.headers["set-cookie"]
+    winner = next(b for b in pool.backends if b.url == f"http://{calls[1]}")
+    assert cookie.startswith(f"{AFFINITY_COOKIE}={winner.key};")
+    assert "Path=/;" in cookie
+
+
+def test_pinned_client_stays_put_without_hedging():
+    calls = []
+
+    async def handle(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.host)
+        await asyncio.sleep(0.2)
+        return reply(b"chat")
+
+    pool, during, response, body = proxy_through(handle, affinity=1)
+    assert calls == ["b"]
+    assert "set-cookie" not in response.headers
+
+
+def test_pinned_client_moves_when_its_instance_fails():
+    calls = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.host)
+        return reply(b"ok")
+
+    async def run():
+        proxy = UpstreamProxy()
+        proxy.client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+        pool = BackendPool(["http://a", "http://b"])
+        pool.backends[1].healthy = False
+        request = inbound("GET", "", cookie=f"{AFFINITY_COOKIE}={pool.backends[1].key}")
+        response = await proxy.forward(request, pool, "", "/team/usa/proxy")
+        await response.close()
+        return pool, response
+
+    pool, response = asyncio.run(run())
+    assert calls == ["a"]
+    assert response.headers["set-cookie"].startswith(f"{AFFINITY_COOKIE}={pool.backends[0].key};")
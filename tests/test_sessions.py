@@ -0,0 +1,18 @@
+import asyncio
+
+from sessions import SessionStore
+from timeline import Timeline
+
+
+def test_close_ends_subscriber_streams():
+    async def run():
+        store = SessionStore(Timeline({}, 20.0), ["usa", "china"])
+        session = store.create("class-a")
+        queues = [session.broker.subscribe("usa"), session.broker.subscribe("admin")]
+        session.broker.publish("usa", "news", {"id": 1})
+        assert store.close("class-a")
+        first = await queues[0].get()
+        return first.event, await queues[0].get(), await queues[1].get(), session.broker.has_subscribers()
+
+    assert asyncio.run(run()) == ("news", None, None, False)
+
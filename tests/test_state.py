@@ -0,0 +1,153 @@
+import asyncio
+
+from state import MemoryBackend, RedisBackend, SQLiteBackend
+
+
+class RespStub:
+    """Just enough of a Redis server for RedisBackend; GET of a key starting with 'slow' answers late"""
+
+    def __init__(self):
+        self.values = {}
+        self.lists = {}
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self.serve, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def serve(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                args = []
+                for _ in range(int(line[1:])):
+                    length = int((await reader.readline())[1:])
+                    args.append((await reader.readexactly(length + 2))[:-2].decode())
+                if args[0] == "GET" and args[1].startswith("slow"):
+                    await asyncio.sleep(0.2)
+                writer.write(self.reply(self.run(*args)))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def run(self, command, *args):
+        if command == "GET":
+            return self.values.get(args[0])
+        if command == "MGET":
+            return [self.values.get(key) for key in args]
+        if command == "SET":
+            self.values[args[0]] = args[1]
+            return "OK"
+        if command == "SETNX":
+            if args[0] in self.values:
+                return 0
+            self.values[args[0]] = args[1]
+            return 1
+        if command == "INCR":
+            self.values[args[0]] = str(int(self.values.get(args[0], 0)) + 1)
+            return int(self.values[args[0]])
+        if command == "RPUSH":
+            self.lists.setdefault(args[0], []).append(args[1])
+            return len(self.lists[args[0]])
+        if command == "LRANGE":
+            items, start, stop = self.lists.get(args[0], []), int(args[1]), int(args[2])
+            return items[start:None if stop == -1 else stop + 1]
+        if command == "LLEN":
+            return len(self.lists.get(args[0], []))
+        if command == "DEL":
+            return sum((self.values.pop(key, None), self.lists.pop(key, None)) != (None, None) for key in args)
+        raise ValueError(command)
+
+    def reply(self, value) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, list):
+            return b"*%d\r\n" % len(value) + b"".join(self.reply(item) for item in value)
+        if value == "OK":
+            return b"+OK\r\n"
+        return b"$%d\r\n%s\r\n" % (len(value.encode()), value.encode())
+
+
+async def connected():
+    stub = RespStub()
+    return stub, RedisBackend("127.0.0.1", await stub.start())
+
+
+def test_commands():
+    async def run():
+        stub, redis = await connected()
+        await redis.set("a", "1")
+        assert await redis.get("a") == "1"
+        assert await redis.get("missing") is None
+        assert await redis.mget(["a", "missing"]) == ["1", None]
+        assert await redis.setnx("a", "2") is False
+        assert await redis.setnx("b", "2") is True
+        assert await redis.incr("n") == 1
+        assert await redis.incr("n") == 2
+        await redis.rpush("l", "x")
+        await redis.rpush("l", "y")
+        assert await redis.lrange("l") == ["x", "y"]
+        assert await redis.lrange("l", 1) == ["y"]
+        assert await redis.llen("l") == 2
+        assert await redis.lscan("l", 0, 1) == (["x"], 1)
+        assert await redis.lscan("l", 1, 5) == (["y"], 2)
+        assert await redis.lscan("l", 2) == ([], 2)
+        await redis.delete(["a", "l", "missing"])
+        assert await redis.get("a") is None
+        assert await redis.llen("l") == 0
+        assert await redis.get("b") == "2"
+        await redis.close()
+
+    asyncio.run(run())
+
+
+def test_cancelled_command_does_not_shift_replies():
+    async def run():
+        stub, redis = await connected()
+        await redis.set("a", "A")
+        await redis.set("slow", "S")
+        slow = asyncio.create_task(redis.get("slow"))
+        await asyncio.sleep(0.05)
+        slow.cancel()
+        await asyncio.gather(slow, return_exceptions=True)
+        # The late reply to GET slow must not be read as the answer to these
+        assert await redis.get("a") == "A"
+        assert await redis.incr("n") == 1
+        await redis.close()
+
+    asyncio.run(run())
+
+
+def test_delete_values_and_lists(tmp_path):
+    async def run(backend):
+        await backend.set("a", "1")
+        await backend.set("b", "2")
+        await backend.rpush("l", "x")
+        await backend.delete(["a", "l", "missing"])
+        result = (await backend.mget(["a", "b"]), await backend.lrange("l"))
+        await backend.close()
+        return result
+
+    for backend in (MemoryBackend(), SQLiteBackend(str(tmp_path / "state.db"))):
+        assert asyncio.run(run(backend)) == ([None, "2"], [])
+
+
+def test_lscan_pages_through_a_list(tmp_path):
+    async def run(backend):
+        await backend.rpush("other", "z")
+        for i in range(7):
+            await backend.rpush("l", str(i))
+        pages, cursor = [], 0
+        while True:
+            items, cursor = await backend.lscan("l", cursor, 3)
+            if not items:
+                break
+            pages.append(items)
+        await backend.close()
+        return pages
+
+    for backend in (MemoryBackend(), SQLiteBackend(str(tmp_path / "state.db"))):
+        assert asyncio.run(run(backend)) == [["0", "1", "2"], ["3", "4", "5"], ["6"]]
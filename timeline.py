@@ -0,0 +1,103 @@
+# timeline.py
+import time
+from bisect import bisect_right
+from typing import Dict, List, NamedTuple, Optional
+
+FINAL_NEWS = {"month": "December 2026", "news": "AGI IMMINENT - FINAL DECISIONS REQUIRED", "id": "final"}
+
+
+class NewsItem(NamedTuple):
+    month: str
+    id: str
+    text: str
+    trigger: Optional[str]
+
+
+class Timeline:
+    """News timeline compiled into a flat array, read as a pure function of the clock.
+
+    Item ``i`` is on screen from ``start + i * interval`` until the next one, so
+    any number of pollers see the same item and reading never moves the cursor.
+    """
+
+    __slots__ = ("items", "months", "month_offsets", "payloads", "interval", "start", "fired")
+
+    def __init__(self, news_timeline: Dict[str, List[dict]], interval: float, start: float = None):
+        self.items: List[NewsItem] = []
+        self.months: List[str] = []
+        self.month_offsets: List[int] = []
+        for month, entries in news_timeline.items():
+            self.months.append(month)
+            self.month_offsets.append(len(self.items))
+            for entry in entries:
+                self.items.append(NewsItem(month, entry["id"], entry["text"], entry["trigger"]))
+
+        # Response bodies built once; the extra slot is shown after the last item
+        self.payloads = [{"month": i.month, "news": i.text, "id": i.id} for i in self.items]
+        self.payloads.append(FINAL_NEWS)
+
+        self.reset(interval, start)
+
+    def fork(self, interval: float = None, start: float = None) -> "Timeline":
+        """A timeline with its own clock sharing this one's compiled arrays"""
+        forked = object.__new__(Timeline)
+        forked.items = self.items
+        forked.months = self.months
+        forked.month_offsets = self.month_offsets
+        forked.payloads = self.payloads
+        forked.interval = self.interval
+        forked.reset(interval, start)
+        return forked
+
+    def reset(self, interval: float = None, start: float = None):
+        """Restart the clock, optionally with new pacing"""
+        if interval is not None:
+            self.interval = interval
+        self.start = time.time() if start is None else start
+        self.fired = 0
+
+    def index_at(self, now: float = None) -> int:
+        elapsed = (time.time() if now is None else now) - self.start
+        return min(max(int(elapsed // self.interval), 0), len(self.items))
+
+    def current(self, now: float = None) -> dict:
+        return self.payloads[self.index_at(now)]
+
+    def month_index(self, index: int) -> int:
+        return bisect_right(self.month_offsets, min(index, len(self.items) - 1)) - 1
+
+    def position(self, now: float = None):
+        """(month, index within month, items in month) for the admin panel"""
+        index = self.index_at(now)
+        month_idx = self.month_index(index)
+        month_end = self.month_offsets[month_idx + 1] if month_idx + 1 < len(self.months) else len(self.items)
+        offset = self.month_offsets[month_idx]
+        return self.months[month_idx], min(index, month_end) - offset, month_end - offset
+
+    def seconds_until_next(self, now: float = None) -> Optional[float]:
+        """Time until the next item appears, or None once the timeline has ended"""
+        now = time.time() if now is None else now
+        index = self.index_at(now)
+        if index >= len(self.items):
+            return None
+        return self.start + (index + 1) * self.interval - now
+
+    def due(self, now: float = None) -> List[NewsItem]:
+        """Items reached since the last call, up to and including the current one"""
+        end = min(self.index_at(now) + 1, len(self.items))
+        reached = self.items[self.fired:end]
+        self.fired = max(self.fired, end)
+        return reached
+
+    def advance_month(self, now: float = None) -> Optional[str]:
+        """Jump the clock to the first item of the next month; None when already in the last month"""
+        now = time.time() if now is None else now
+        month_idx = self.month_index(self.index_at(now))
+        if month_idx >= len(self.months) - 1:
+            return None
+
+        offset = self.month_offsets[month_idx + 1]
+        self.start = now - offset * self.interval
+        # Skipped items never fire, matching a manual jump past them
+        self.fired = offset
+        return self.months[month_idx + 1]
@@ -0,0 +1,274 @@
+# tracing.py
+import asyncio
+import hashlib
+import json
+import re
+import secrets
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, List, Optional
+
+import httpx
+
+# Id of the inbound request being served, inherited by tasks it starts
+current_request: ContextVar[Optional[str]] = ContextVar("current_request", default=None)
+REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+# httpcore trace events marking the start and end of each connection phase
+PHASES = {
+    "connect": ("connection.connect_tcp.started", "connection.connect_tcp.complete"),
+    "tls": ("connection.start_tls.started", "connection.start_tls.complete"),
+}
+FIRST_BYTE = ("http11.receive_response_headers.complete", "http2.receive_response_headers.complete")
+
+
+class Span:
+    """One outbound call: phase timings in seconds from its start, plus the inbound request that caused it"""
+
+    __slots__ = ("name", "request_id", "trace_id", "span_id", "start", "started", "duration", "marks", "attributes", "error")
+
+    def __init__(self, name: str, request_id: Optional[str], attributes: Dict[str, object]):
+        self.name = name
+        self.request_id = request_id
+        # Spans of one inbound request share a trace id; background calls get their own
+        self.trace_id = hashlib.md5(request_id.encode()).hexdigest() if request_id else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.start = time.time()
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.marks: Dict[str, float] = {}
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def mark(self, event: str):
+        self.marks.setdefault(event, time.perf_counter() - self.started)
+
+    def phases(self) -> Dict[str, Optional[float]]:
+        result = {}
+        for phase, (begin, end) in PHASES.items():
+            result[phase] = self.marks[end] - self.marks[begin] if begin in self.marks and end in self.marks else None
+        result["ttfb"] = next((self.marks[event] for event in FIRST_BYTE if event in self.marks), None)
+        result["total"] = self.duration
+        return result
+
+    def describe(self) -> dict:
+        return {
+            "name": self.name,
+            "request_id": self.request_id,
+            "start": self.start,
+            **{f"{phase}_ms": round(value * 1000, 2) if value is not None else None for phase, value in self.phases().items()},
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+    def otlp(self) -> dict:
+        """This span in OTLP/JSON form; the phase boundaries become span events"""
+        start_ns = int(self.start * 1e9)
+        events = [
+            {"name": event, "timeUnixNano": str(start_ns + int(offset * 1e9))}
+            for event, offset in sorted(self.marks.items(), key=lambda item: item[1])
+        ]
+        attributes = [
+            {"key": key, "value": {"intValue": str(value)} if isinstance(value, int) else {"stringValue": str(value)}}
+            for key, value in self.attributes.items()
+        ]
+        if self.request_id:
+            attributes.append({"key": "http.request_id", "value": {"stringValue": self.request_id}})
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            # SPAN_KIND_CLIENT
+            "kind": 3,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(start_ns + int((self.duration or 0) * 1e9)),
+            "attributes": attributes,
+            "events": events,
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1}
+        }
+
+
+class Tracer:
+    """Spans for outbound calls, kept in a ring buffer and optionally exported as OTLP/JSON.
+
+    httpx clients get spans from ``transport()``, which times each request
+    through httpx's ``trace`` extension. Other calls (the Vast.ai SDK) use
+    the ``span()`` context manager, which is safe from worker threads. With
+    an ``export_path``, finished spans are appended to that file in batches,
+    one OTLP ExportTraceServiceRequest per line, as the collector's file
+    exporter writes them.
+    """
+
+    def __init__(self, capacity: int = 2000, export_path: str = None, flush_interval: float = 5.0, service: str = "railway-ai-ethics"):
+        # Spans are added when they start, so slow calls show up while still in flight
+        self.spans: Deque[Span] = deque(maxlen=capacity)
+        self.export_path = export_path
+        self.flush_interval = flush_interval
+        self.service = service
+        self.pending: Deque[Span] = deque()
+        self.task: Optional[asyncio.Task] = None
+
+    def begin(self, name: str, **attributes) -> Span:
+        span = Span(name, current_request.get(), attributes)
+        self.spans.append(span)
+        return span
+
+    def end(self, span: Span, error: BaseException = None):
+        span.duration = time.perf_counter() - span.started
+        if error is not None:
+            span.error = type(error).__name__
+        if self.export_path:
+            self.pending.append(span)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        span = self.begin(name, **attributes)
+        try:
+            yield span
+        except BaseException as e:
+            self.end(span, e)
+            raise
+        self.end(span)
+
+    def transport(self, **kwargs) -> "TracingTransport":
+        """An httpx transport (taking AsyncHTTPTransport's arguments) that records a span per request"""
+        return TracingTransport(httpx.AsyncHTTPTransport(**kwargs), self)
+
+    def recent(self, limit: int = 200, request_id: str = None) -> List[Span]:
+        spans = [span for span in self.spans if request_id is None or span.request_id == request_id]
+        return spans[-limit:][::-1]
+
+    def start(self):
+        if self.export_path:
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        batch = []
+        while self.pending:
+            batch.append(self.pending.popleft())
+        if not batch:
+            return
+        line = json.dumps({"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service}}]},
+            "scopeSpans": [{"scope": {"name": "tracing"}, "spans": [span.otlp() for span in batch]}]
+        }]})
+        # File I/O blocks; keep it off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, self._append, line + "\n")
+
+    def _append(self, line: str):
+        with open(self.export_path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+        await self.flush()
+
+
+class TracedStream(httpx.AsyncByteStream):
+    """Response body that ends its span when the body is closed, so total time covers the whole download"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, span: Span, tracer: Tracer):
+        self.stream = stream
+        self.span = span
+        self.tracer = tracer
+        self.error: Optional[BaseException] = None
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self.stream:
+                yield chunk
+        except BaseException as e:
+            self.error = e
+            raise
+
+    async def aclose(self):
+        try:
+            await self.stream.aclose()
+        finally:
+            if self.span.duration is None:
+                self.tracer.end(self.span, self.error)
+
+
+class TracingTransport(httpx.AsyncBaseTransport):
+    """Wraps a transport, recording connect, TLS, time to first byte and total time per request.
+
+    Phases come from httpcore's ``trace`` extension. The connect phase
+    includes resolving the host name, which httpcore does not time
+    separately; it is absent when a pooled connection was reused.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, tracer: Tracer):
+        self.transport = transport
+        self.tracer = tracer
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        span = self.tracer.begin(
+            f"{request.method} {request.url.host}",
+            **{"http.method": request.method, "http.url": str(request.url.copy_with(query=None)), "server.address": request.url.host}
+        )
+        chained = request.extensions.get("trace")
+
+        async def trace(event: str, info: dict):
+            span.mark(event)
+            if chained:
+                await chained(event, info)
+
+        request.extensions = {**request.extensions, "trace": trace}
+        try:
+            response = await self.transport.handle_async_request(request)
+        except BaseException as e:
+            self.tracer.end(span, e)
+            raise
+        span.attributes["http.status_code"] = response.status_code
+        return httpx.Response(
+            response.status_code, headers=response.headers,
+            stream=TracedStream(response.stream, span, self.tracer), extensions=response.extensions
+        )
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class RequestIdMiddleware:
+    """Gives each inbound HTTP request an id (the caller's X-Request-ID if sane) for span correlation"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        if not request_id or not REQUEST_ID.match(request_id):
+            request_id = secrets.token_hex(8)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode())]
+            await send(message)
+
+        token = current_request.set(request_id)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request.reset(token)